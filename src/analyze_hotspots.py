@@ -1,11 +1,10 @@
 # -*- coding: utf-8 -*-
 
-import pandas as pd
-
-LOG_FILE = "data/logs/vehicle_log.csv"
+from vehicle_log import load_vehicle_log
+from log_aggregation import group_rates
 
 print("Loading log file...")
-df = pd.read_csv(LOG_FILE)
+df = load_vehicle_log()
 
 print("Total rows:", len(df))
 
@@ -15,16 +14,11 @@ print("Total rows:", len(df))
 
 print("\nAggregating by lane_id...")
 
-lane_group = df.groupby("lane_id")
-
-summary = lane_group.agg(
-    avg_speed=("speed", "mean"),
-    congestion_ratio=("speed", lambda x: (x < 1).mean()),
-    violation_count=("violation_type", lambda x: (x != "none").sum()),
-    total_samples=("vehicle_id", "count")
-)
-
-summary["violation_ratio"] = summary["violation_count"] / summary["total_samples"]
+summary = group_rates(df, "lane_id").rename(columns={
+    "mean_speed": "avg_speed",
+    "vehicle_count": "total_samples",
+    "violation_rate": "violation_ratio",
+})
 
 # Sort by congestion
 top_congested = summary.sort_values("congestion_ratio", ascending=False).head(15)
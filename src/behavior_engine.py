@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized behavior engine for the simulation loop.
+
+Given one step's state arrays for every vehicle, computes the pressure
+model and draws all violation decisions in one batch from a seeded
+numpy Generator. Only the indices of vehicles that need a TraCI command
+are returned, so the caller's Python work scales with the number of
+violations rather than the number of vehicles.
+"""
+
+from dataclasses import dataclass
+import numpy as np
+
+
+@dataclass
+class StepDecisions:
+    pressure: np.ndarray
+    lane_change: np.ndarray         # vehicle indices
+    lane_change_target: np.ndarray  # target lane index per lane_change entry
+    wrong_way: np.ndarray
+    surge: np.ndarray
+
+
+class BehaviorEngine:
+
+    def __init__(self, seed,
+                 enable_aggression=True,
+                 enable_contagion=True,
+                 enable_wrong_way=True,
+                 enable_speed_surge=True,
+                 aggression_scale=0.20,
+                 contagion_multiplier=1.10,
+                 wrong_way_prob_scale=0.005,
+                 surge_pressure_threshold=1.3,
+                 surge_prob_scale=0.1):
+
+        self.rng = np.random.default_rng(seed)
+
+        self.enable_aggression = enable_aggression
+        self.enable_contagion = enable_contagion
+        self.enable_wrong_way = enable_wrong_way
+        self.enable_speed_surge = enable_speed_surge
+
+        self.aggression_scale = aggression_scale
+        self.contagion_multiplier = contagion_multiplier
+        self.wrong_way_prob_scale = wrong_way_prob_scale
+        self.surge_pressure_threshold = surge_pressure_threshold
+        self.surge_prob_scale = surge_prob_scale
+
+    def draw_traits(self, n):
+        # Driver aggressiveness for newly seen vehicles
+        return self.rng.random(n)
+
+    def compute_pressure(self, speed, waiting, max_speed, near_violation):
+        pressure = np.minimum(waiting / 60.0, 1.0)
+
+        moving = max_speed > 0
+        deficit = np.maximum(0.0, max_speed - speed)
+        pressure += np.divide(deficit, max_speed,
+                              out=np.zeros_like(deficit), where=moving)
+
+        if self.enable_contagion:
+            pressure = np.where(near_violation,
+                                pressure * self.contagion_multiplier,
+                                pressure)
+
+        # Cap pressure to prevent runaway
+        return np.minimum(pressure, 2.0)
+
+    def decide(self, step, speed, waiting, max_speed, aggressiveness,
+               capability, surge_cooldown, lane_index, num_lanes,
+               near_violation):
+
+        n = len(speed)
+        pressure = self.compute_pressure(speed, waiting, max_speed, near_violation)
+
+        # One uniform per decision per vehicle: lane change, wrong way, surge
+        draws = self.rng.random((n, 3))
+        multi_lane = num_lanes > 1
+
+        if self.enable_aggression:
+            violation_prob = aggressiveness * capability * pressure * self.aggression_scale
+            lane_change = np.flatnonzero((draws[:, 0] < violation_prob) & multi_lane)
+        else:
+            lane_change = np.empty(0, dtype=np.int64)
+
+        current = lane_index[lane_change]
+        lane_change_target = np.where(
+            current + 1 < num_lanes[lane_change], current + 1, current - 1
+        )
+
+        if self.enable_wrong_way:
+            wrong_way = np.flatnonzero(
+                multi_lane & (draws[:, 1] < aggressiveness * self.wrong_way_prob_scale)
+            )
+        else:
+            wrong_way = np.empty(0, dtype=np.int64)
+
+        if self.enable_speed_surge:
+            surge = np.flatnonzero(
+                (step >= surge_cooldown)
+                & (pressure > self.surge_pressure_threshold)
+                & (draws[:, 2] < aggressiveness * self.surge_prob_scale)
+            )
+        else:
+            surge = np.empty(0, dtype=np.int64)
+
+        return StepDecisions(
+            pressure=pressure,
+            lane_change=lane_change,
+            lane_change_target=lane_change_target,
+            wrong_way=wrong_way,
+            surge=surge
+        )
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+Side-by-side throughput of the traci and libsumo backends on the
+Hinjewadi peak scenario, plus a check that both produce identical logs.
+
+The backend is fixed at import time, so each measurement runs
+run_simulation.run() in a child process with SUMO_BACKEND set.
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+import pandas as pd
+
+from vehicle_log import load_vehicle_log
+
+BACKENDS = ["traci", "libsumo"]
+BENCH_STEPS = 600
+BENCH_DIR = "data/benchmarks/backends"
+
+
+def run_child(backend):
+    log_dir = os.path.join(BENCH_DIR, backend)
+    env = {**os.environ, "SUMO_BACKEND": backend}
+
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", log_dir],
+        env=env, capture_output=True, text=True
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    return json.loads(result.stdout.strip().splitlines()[-1]), log_dir
+
+
+def child(log_dir):
+    import run_simulation
+
+    summary = run_simulation.run(
+        {"SIMULATION_STEPS": BENCH_STEPS, "LOG_FORMAT": "parquet",
+         "LOG_WRITER_THREAD": False},
+        log_dir=log_dir
+    )
+    summary["backend"] = run_simulation.BACKEND_NAME
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        child(sys.argv[2])
+        sys.exit(0)
+
+    print(f"Benchmarking {BENCH_STEPS} steps per backend...\n")
+
+    summaries = {}
+    log_dirs = {}
+
+    for backend in BACKENDS:
+        try:
+            summaries[backend], log_dirs[backend] = run_child(backend)
+        except RuntimeError as e:
+            print(f"[FAIL] {backend}")
+            print(f"       -> {e}")
+            continue
+
+        wall = summaries[backend]["wall_time"]
+        print(f"{backend:>8}: {BENCH_STEPS / wall:8.1f} steps/sec ({wall:.1f}s)")
+
+    if len(summaries) == len(BACKENDS):
+        print(f"\nlibsumo speedup: "
+              f"{summaries['traci']['wall_time'] / summaries['libsumo']['wall_time']:.2f}x")
+
+        logs = [
+            load_vehicle_log(
+                os.path.join(log_dirs[b], "vehicle_log.parquet")
+            ).astype({"vehicle_id": str, "lane_id": str, "violation_type": str})
+            for b in BACKENDS
+        ]
+
+        try:
+            pd.testing.assert_frame_equal(logs[0], logs[1])
+            print("[PASS] Logs are identical across backends")
+        except AssertionError as e:
+            print("[FAIL] Logs differ across backends")
+            print(f"       -> {e}")
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+Steps/sec of the per-step vehicle state fetch for each StateFetcher mode.
+
+Runs the peak scenario without behavior injection so only the TraCI
+state round-trips are measured.
+"""
+
+import time
+import traci.constants as tc
+
+from sumo_backend import traci
+from state_fetch import StateFetcher, FETCH_MODES
+
+NET_FILE = "data/sumo_network/hinjewadi_phase3.net.xml"
+ROUTE_FILE = "data/sumo_network/hinjewadi_peak.rou.xml"
+SUMO_BINARY = "sumo"
+
+BENCH_STEPS = 900
+WARMUP_STEPS = 300  # let the network fill up before timing
+
+
+def run_benchmark(mode):
+    traci.start([
+        SUMO_BINARY,
+        "-n", NET_FILE,
+        "-r", ROUTE_FILE,
+        "--start",
+        "--quit-on-end",
+        "--seed", "42"
+    ])
+
+    fetcher = StateFetcher(mode)
+    fetcher.setup()
+
+    for _ in range(WARMUP_STEPS):
+        traci.simulationStep()
+        fetcher.fetch()
+
+    vehicle_steps = 0
+    start = time.perf_counter()
+
+    for _ in range(BENCH_STEPS):
+        traci.simulationStep()
+        states = fetcher.fetch()
+
+        for state in states.values():
+            fetcher.lane_count(state[tc.VAR_ROAD_ID])
+
+        vehicle_steps += len(states)
+
+    elapsed = time.perf_counter() - start
+    traci.close()
+
+    return BENCH_STEPS / elapsed, vehicle_steps / BENCH_STEPS
+
+
+if __name__ == "__main__":
+    print(f"Benchmarking {BENCH_STEPS} steps after {WARMUP_STEPS} warm-up steps...\n")
+
+    results = {}
+
+    for mode in FETCH_MODES:
+        steps_per_sec, mean_vehicles = run_benchmark(mode)
+        results[mode] = steps_per_sec
+        print(f"{mode:>12}: {steps_per_sec:8.1f} steps/sec "
+              f"(mean {mean_vehicles:.0f} vehicles/step)")
+
+    baseline = results["polling"]
+    print()
+    for mode in FETCH_MODES[1:]:
+        print(f"{mode} speedup over polling: {results[mode] / baseline:.2f}x")
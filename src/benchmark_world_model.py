@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""
+WorldModel forward / training-step throughput on CPU: per-timestep GCN
+loop versus the fused batched path, optionally with torch.compile and a
+TorchScript trace. Checks that both paths give the same outputs.
+
+Uses the real lane graph when it exists, otherwise a random sparse graph
+of SYNTH_LANES lanes.
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+import torch
+
+from world_model import WorldModel, build_normalized_adjacency
+
+GRAPH_FILE = "data/processed/lane_graph_edges.csv"
+MANIFEST_DIR = "data/processed/world_state"
+
+WINDOW = 20
+HIDDEN_DIM = 32
+BATCH_SIZE = 16
+REPEATS = 10
+
+SYNTH_LANES = 2000
+SYNTH_OUT_DEGREE = 3
+
+TRY_COMPILE = True
+TRY_TORCHSCRIPT = True
+
+
+def load_graph():
+    if os.path.exists(GRAPH_FILE) and os.path.exists(os.path.join(MANIFEST_DIR, "manifest.json")):
+        from world_state import load_dense
+        _, _, manifest = load_dense(MANIFEST_DIR)
+        lanes = manifest["lanes"]
+        edges = pd.read_csv(GRAPH_FILE)
+    else:
+        rng = np.random.default_rng(0)
+        lanes = [f"lane_{i}" for i in range(SYNTH_LANES)]
+        src = np.repeat(np.arange(SYNTH_LANES), SYNTH_OUT_DEGREE)
+        tgt = rng.integers(0, SYNTH_LANES, len(src))
+        edges = pd.DataFrame({
+            "source_lane": np.array(lanes)[src],
+            "target_lane": np.array(lanes)[tgt],
+        })
+
+    lane_to_idx = {lane: i for i, lane in enumerate(lanes)}
+    return build_normalized_adjacency(edges, lane_to_idx, len(lanes)), len(lanes)
+
+
+def timed(fn):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn()
+    return (time.perf_counter() - start) / REPEATS
+
+
+def train_step(model, forward, x, y, optimizer, criterion):
+    optimizer.zero_grad()
+    loss = criterion(forward(x), y)
+    loss.backward()
+    optimizer.step()
+
+
+if __name__ == "__main__":
+    torch.manual_seed(0)
+
+    a_hat, num_lanes = load_graph()
+    print(f"Lanes: {num_lanes} | adjacency nnz: {a_hat._nnz()} | "
+          f"batch {BATCH_SIZE} x window {WINDOW}\n")
+
+    model = WorldModel(a_hat, hidden_dim=HIDDEN_DIM)
+    x = torch.randn(BATCH_SIZE, WINDOW, num_lanes, 3)
+    y = (torch.rand(BATCH_SIZE, num_lanes) < 0.05).float()
+
+    model.eval()
+    with torch.no_grad():
+        reference = model.forward_per_timestep(x)
+        fused = model(x)
+    torch.testing.assert_close(fused, reference)
+    print("[PASS] Fused and per-timestep outputs match")
+
+    paths = {
+        "per-timestep": model.forward_per_timestep,
+        "fused": model.forward,
+    }
+
+    if TRY_COMPILE:
+        try:
+            compiled = torch.compile(model)
+            with torch.no_grad():
+                compiled(x)
+            paths["fused + compile"] = compiled
+        except Exception as e:
+            print(f"[SKIP] torch.compile -> {e}")
+
+    if TRY_TORCHSCRIPT:
+        try:
+            from world_model import export_torchscript
+            traced = export_torchscript(model, x, "world_model_bench.pt")
+            os.remove("world_model_bench.pt")
+            paths["fused + torchscript"] = traced
+        except Exception as e:
+            print(f"[SKIP] TorchScript -> {e}")
+
+    print(f"\n{'path':>20} | {'inference':>14} | {'train step':>14}")
+
+    baseline = None
+    for name, forward in paths.items():
+        with torch.no_grad():
+            infer = timed(lambda: forward(x))
+
+        train = float("nan")
+        if name != "fused + torchscript":
+            model.train()
+            optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+            criterion = torch.nn.BCEWithLogitsLoss()
+            train = timed(lambda: train_step(model, forward, x, y, optimizer, criterion))
+            model.eval()
+
+        baseline = baseline or infer
+        print(f"{name:>20} | {BATCH_SIZE / infer:8.1f} smp/s | "
+              f"{BATCH_SIZE / train:8.1f} smp/s | {baseline / infer:5.2f}x")
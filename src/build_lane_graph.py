@@ -1,40 +1,46 @@
 # -*- coding: utf-8 -*-
 
-import traci
 import os
+import numpy as np
 import pandas as pd
 
+from compiled_network import load_compiled_network
+
 NET_FILE = "data/sumo_network/hinjewadi_phase3.net.xml"
 STATE_FILE = "data/processed/lane_time_tensor.csv"
 OUTPUT_FILE = "data/processed/lane_graph_edges.csv"
 
 print("Loading active lanes from state tensor...")
-state_df = pd.read_csv(STATE_FILE)
-active_lanes = set(state_df["lane_id"].unique())
+state_df = pd.read_csv(STATE_FILE, usecols=["lane_id"])
+active_lanes = state_df["lane_id"].unique().astype(str)
 
 print("Active lanes:", len(active_lanes))
 
-print("Starting SUMO to extract lane connectivity...")
-traci.start(["sumo", "-n", NET_FILE, "--quit-on-end"])
+print("Extracting lane connectivity from network file...")
+net = load_compiled_network(NET_FILE)
+edges = net.lane_connections()
+lane_ids = net.lane_ids
+print("Network connections:", len(edges))
 
-edges = []
+codes = net.lane_codes(active_lanes)
 
-for lane in active_lanes:
-    try:
-        links = traci.lane.getLinks(lane)
+connected = np.zeros(net.num_lanes, dtype=bool)
+connected[edges.ravel()] = True
 
-        for link in links:
-            target_lane = link[0]
+missing = ((codes < 0) | ~connected[np.maximum(codes, 0)]).sum()
+if missing:
+    print(f"[WARN] {missing} active lanes have no connections in {NET_FILE}")
 
-            # Only keep edges within active lane set
-            if target_lane in active_lanes:
-                edges.append((lane, target_lane))
-    except:
-        continue
+active = np.zeros(net.num_lanes, dtype=bool)
+active[codes[codes >= 0]] = True
 
-traci.close()
+# Only keep edges within active lane set
+keep = active[edges[:, 0]] & active[edges[:, 1]]
 
-df_edges = pd.DataFrame(edges, columns=["source_lane", "target_lane"])
+df_edges = pd.DataFrame({
+    "source_lane": lane_ids[edges[keep, 0]],
+    "target_lane": lane_ids[edges[keep, 1]],
+})
 
 os.makedirs("data/processed", exist_ok=True)
 df_edges.to_csv(OUTPUT_FILE, index=False)
@@ -43,4 +49,4 @@ print(f"[PASS] Saved filtered lane graph to {OUTPUT_FILE}")
 print("Filtered edge count:", len(df_edges))
 print("Unique source lanes:", df_edges["source_lane"].nunique())
 print("Unique target lanes:", df_edges["target_lane"].nunique())
-print("Done.")
\ No newline at end of file
+print("Done.")
@@ -3,67 +3,209 @@
 import pandas as pd
 import numpy as np
 import os
+import json
 
-LOG_FILE = "data/logs/vehicle_log.csv"
-OUTPUT_FILE = "data/processed/lane_time_tensor.csv"
-
-FUTURE_DELTA = 10  # seconds ahead for prediction
-CONGESTION_SPEED_THRESHOLD = 1.0  # m/s
-
-print("Loading vehicle log...")
-df = pd.read_csv(LOG_FILE)
-
-print("Aggregating per lane per timestep...")
+from vehicle_log import iter_vehicle_log
+from log_aggregation import dense_lane_time_sums, CONGESTION_SPEED_THRESHOLD
+from world_state import FEATURE_NAMES
 
-grouped = df.groupby(["time", "lane_id"]).agg(
-    mean_speed=("speed", "mean"),
-    vehicle_count=("vehicle_id", "count"),
-    violation_rate=("violation_type", lambda x: (x != "none").mean())
-).reset_index()
-
-# Congestion ratio = 1 if slow, 0 otherwise
-grouped["congestion_flag"] = (
-    grouped["mean_speed"] < CONGESTION_SPEED_THRESHOLD
-).astype(int)
-
-# Ensure full time index per lane
-print("Filling missing timesteps...")
-
-all_times = np.arange(grouped["time"].min(), grouped["time"].max() + 1)
-all_lanes = grouped["lane_id"].unique()
+OUTPUT_FILE = "data/processed/lane_time_tensor.csv"
 
-full_index = pd.MultiIndex.from_product(
-    [all_times, all_lanes],
-    names=["time", "lane_id"]
-)
+# Dense copy for the trainer: features.npy [T, N, F] / labels.npy [T, N]
+# float32 (np.load(..., mmap_mode="r")) plus a lane index manifest.json
+DENSE_DIR = "data/processed/world_state"
 
-grouped = grouped.set_index(["time", "lane_id"])
-grouped = grouped.reindex(full_index)
+FUTURE_DELTA = 10  # seconds ahead for prediction
 
-# Fill missing values
-grouped["mean_speed"] = grouped["mean_speed"].fillna(0)
-grouped["vehicle_count"] = grouped["vehicle_count"].fillna(0)
-grouped["violation_rate"] = grouped["violation_rate"].fillna(0)
-grouped["congestion_flag"] = grouped["congestion_flag"].fillna(0)
+# Log rows read per chunk
+CHUNK_ROWS = 1_000_000
+# Timesteps aggregated at once: dense per-lane arrays never span more than
+# BLOCK_STEPS + FUTURE_DELTA timesteps, however sparse the log is
+BLOCK_STEPS = 64
 
-grouped = grouped.reset_index()
+LOG_COLUMNS = ["time", "lane_id", "speed", "violation_type"]
 
-print("Computing future congestion labels...")
 
-grouped["future_congestion"] = (
-    grouped.groupby("lane_id")["congestion_flag"]
-    .shift(-FUTURE_DELTA)
-)
+# =============================
+# PASS 1: LANE SET + TIME RANGE
+# =============================
 
-grouped["future_congestion"] = grouped["future_congestion"].fillna(0)
+def scan_log(log_path=None):
+    lanes = set()
+    t_min, t_max = None, None
 
-# Optional: remove last FUTURE_DELTA timesteps (no valid future)
-max_time = grouped["time"].max()
-grouped = grouped[grouped["time"] <= max_time - FUTURE_DELTA]
+    for chunk in iter_vehicle_log(log_path, columns=["time", "lane_id"], chunk_rows=CHUNK_ROWS):
+        lanes.update(chunk["lane_id"].unique())
+        t_min = chunk["time"].iloc[0] if t_min is None else t_min
+        t_max = chunk["time"].iloc[-1]
 
-os.makedirs("data/processed", exist_ok=True)
-grouped.to_csv(OUTPUT_FILE, index=False)
+    return sorted(lanes), int(t_min), int(t_max)
+
+
+# =============================
+# PASS 2: STREAMING AGGREGATION
+# =============================
 
-print(f"[PASS] Saved processed tensor to {OUTPUT_FILE}")
-print(f"Total rows: {len(grouped)}")
-print("Done.")
\ No newline at end of file
+def iter_time_blocks(log_path=None):
+    """
+    Yield log chunks cut on timestep boundaries, so every timestep's rows
+    arrive in exactly one block. Relies on the log being time-ordered.
+    """
+    carry = None
+
+    for chunk in iter_vehicle_log(log_path, columns=LOG_COLUMNS, chunk_rows=CHUNK_ROWS):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        last_time = chunk["time"].iloc[-1]
+        complete = chunk["time"] != last_time
+
+        carry = chunk[~complete]
+        if complete.any():
+            yield chunk[complete]
+
+    if carry is not None and len(carry):
+        yield carry
+
+
+def iter_lane_blocks(lanes, log_path=None, block_steps=BLOCK_STEPS):
+    """
+    Yield (t0, mean_speed, vehicle_count, violation_rate) for consecutive
+    runs of at most `block_steps` timesteps, each a dense [steps, lanes]
+    array; timesteps without vehicles are yielded as zeros.
+    """
+    num_lanes = len(lanes)
+    next_time = None
+
+    for block in iter_time_blocks(log_path):
+        times = block["time"].to_numpy()
+        lane_codes = pd.Categorical(block["lane_id"], categories=lanes).codes
+        speed = block["speed"].to_numpy()
+        is_violation = (block["violation_type"] != "none").to_numpy()
+
+        first, last = int(times[0]), int(times[-1])
+        if next_time is None:
+            next_time = first
+
+        # Rows are time-ordered: each sub-block is one contiguous row range
+        for t0 in range(next_time, last + 1, block_steps):
+            span = min(block_steps, last + 1 - t0)
+            lo, hi = np.searchsorted(times, [t0, t0 + span])
+
+            count, speed_sum, violations = dense_lane_time_sums(
+                times[lo:hi], lane_codes[lo:hi], speed[lo:hi], is_violation[lo:hi],
+                t0, span, num_lanes
+            )
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean_speed = np.where(count > 0, speed_sum / count, 0.0)
+                violation_rate = np.where(count > 0, violations / count, 0.0)
+
+            yield t0, mean_speed, count.astype(float), violation_rate
+
+        next_time = last + 1
+
+
+# =============================
+# BUILD
+# =============================
+
+def build(log_path=None, dense_dir=DENSE_DIR, output_file=OUTPUT_FILE):
+    """
+    Build the world state of one vehicle log (default: the latest log)
+    into `dense_dir`, plus the long-format CSV unless `output_file` is None.
+    Returns the manifest.
+    """
+    print("Scanning lanes in vehicle log...")
+    lanes, t_min, t_max = scan_log(log_path)
+    lane_column = np.array(lanes, dtype=object)
+    num_timesteps = max(t_max - t_min + 1 - FUTURE_DELTA, 0)
+
+    print("Aggregating per lane per timestep (streaming)...")
+
+    if output_file is not None:
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+
+    os.makedirs(dense_dir, exist_ok=True)
+    features = np.lib.format.open_memmap(
+        os.path.join(dense_dir, "features.npy"), mode="w+", dtype=np.float32,
+        shape=(num_timesteps, len(lanes), len(FEATURE_NAMES))
+    )
+    labels = np.lib.format.open_memmap(
+        os.path.join(dense_dir, "labels.npy"), mode="w+", dtype=np.float32,
+        shape=(num_timesteps, len(lanes))
+    )
+
+    # The last FUTURE_DELTA timesteps wait for the block holding their label
+    tail = None
+    total_rows = 0
+    header = True
+
+    for t0, mean_speed, vehicle_count, violation_rate in iter_lane_blocks(lanes, log_path):
+
+        # Congestion ratio = 1 if slow, 0 otherwise (empty lanes are not congested)
+        congestion_flag = (
+            (vehicle_count > 0) & (mean_speed < CONGESTION_SPEED_THRESHOLD)
+        ).astype(float)
+
+        block = [mean_speed, vehicle_count, violation_rate, congestion_flag]
+        if tail is not None:
+            t0 = tail[0]
+            block = [np.concatenate([a, b]) for a, b in zip(tail[1], block)]
+
+        # Timesteps within FUTURE_DELTA of the end never get a label
+        ready = len(block[0]) - FUTURE_DELTA
+        tail = (t0 + max(ready, 0), [a[max(ready, 0):] for a in block])
+        if ready <= 0:
+            continue
+
+        mean_speed, vehicle_count, violation_rate, congestion_flag = (a[:ready] for a in block)
+        future_congestion = block[3][FUTURE_DELTA:]
+
+        rows = slice(t0 - t_min, t0 - t_min + ready)
+        features[rows, :, 0] = mean_speed
+        features[rows, :, 1] = vehicle_count
+        features[rows, :, 2] = violation_rate
+        labels[rows] = future_congestion
+        total_rows += ready * len(lanes)
+
+        if output_file is not None:
+            pd.DataFrame({
+                "time": np.repeat(np.arange(t0, t0 + ready), len(lanes)),
+                "lane_id": np.tile(lane_column, ready),
+                "mean_speed": mean_speed.ravel(),
+                "vehicle_count": vehicle_count.ravel(),
+                "violation_rate": violation_rate.ravel(),
+                "congestion_flag": congestion_flag.ravel(),
+                "future_congestion": future_congestion.ravel(),
+            }).to_csv(output_file, mode="a", header=header, index=False)
+            header = False
+
+    features.flush()
+    labels.flush()
+    del features, labels
+
+    manifest = {
+        "lanes": lanes,
+        "t0": t_min,
+        "num_timesteps": num_timesteps,
+        "features": FEATURE_NAMES,
+        "future_delta": FUTURE_DELTA,
+    }
+    with open(os.path.join(dense_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    if output_file is not None:
+        print(f"[PASS] Saved processed tensor to {output_file}")
+    print(f"[PASS] Saved dense tensor to {dense_dir} "
+          f"[{num_timesteps}, {len(lanes)}, {len(FEATURE_NAMES)}]")
+    print(f"Total rows: {total_rows}")
+
+    return manifest
+
+
+if __name__ == "__main__":
+    build()
+    print("Done.")
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compiled SUMO network: the topology the tools need, as flat arrays.
+
+The .net.xml is stream-parsed once and written as .npy files under
+
+    data/processed/compiled_network/<net file hash>/
+
+which later runs memory-map, so loading costs no XML parsing however large
+the extract is. A changed network file gets a new cache directory.
+
+Contents (codes are row numbers; edges sorted by ID, lanes grouped by edge
+in lane-index order, so each edge's lanes are one contiguous range):
+
+    edges        ID, from / to junction, function, type, priority, lane range
+    lanes        ID, edge, index, length, speed, permission bitmask
+    permissions  allowed vehicle classes per lane as bits of `vclasses`
+    connections  lane -> lane (via internal lane), and the edge -> edge
+                 successor / predecessor lists derived from them (CSR)
+    geometry     lane shapes (flattened points + ranges), junction positions
+
+CompiledNetwork answers the questions the scripts used to ask sumolib:
+edge by ID, lanes of an edge, incoming / outgoing edges, lane permissions.
+As in sumolib (readNet without internal edges), edge successors only
+count connections between non-internal edges.
+
+It is the one cache of the network: the junction / lane incidence of the
+junction analyses and the lane -> lane graph of the world model are
+derived from these arrays, not parsed again.
+"""
+
+import os
+import json
+import hashlib
+import xml.etree.ElementTree as ET
+import numpy as np
+
+NET_FILE = "data/sumo_network/hinjewadi_phase3.net.xml"
+COMPILED_ROOT = "data/processed/compiled_network"
+
+# SUMO vehicle classes; classes found in the network but missing here are
+# appended per network (the table is stored with the cache)
+VEHICLE_CLASSES = [
+    "private", "emergency", "authority", "army", "vip", "pedestrian",
+    "passenger", "hov", "taxi", "bus", "coach", "delivery", "truck",
+    "trailer", "motorcycle", "moped", "bicycle", "evehicle", "tram",
+    "rail_urban", "rail", "rail_electric", "rail_fast", "ship",
+    "custom1", "custom2", "container", "cable_car", "subway", "aircraft",
+    "wheelchair", "scooter", "drone",
+]
+
+ARRAYS = [
+    "vclasses",
+    "edge_ids", "edge_from", "edge_to", "edge_function", "edge_type",
+    "edge_priority", "edge_lane_indptr",
+    "lane_ids", "lane_edge", "lane_index", "lane_length", "lane_speed",
+    "lane_permissions", "lane_order",
+    "conn_from_lane", "conn_to_lane", "conn_via_lane",
+    "out_indptr", "out_indices", "in_indptr", "in_indices",
+    "shape_points", "lane_shape_indptr",
+    "junction_ids", "junction_type", "junction_xy",
+]
+
+
+def net_file_hash(path):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()[:16]
+
+
+def file_stamp(path):
+    """(size, mtime_ns) of a file: cheap to read, changes whenever the file does."""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def cache_dir(net_file, root):
+    """
+    Cache directory of `net_file` under `root`, keyed by the file hash.
+    The hash is remembered in root/stamps.json next to the file's
+    (size, mtime_ns) and only recomputed when either changed, so loading
+    a cached network does not read the whole net.xml.
+    """
+    stamps_file = os.path.join(root, "stamps.json")
+    key = os.path.abspath(net_file)
+    stamp = file_stamp(net_file)
+
+    stamps = {}
+    if os.path.exists(stamps_file):
+        try:
+            with open(stamps_file) as f:
+                stamps = json.load(f)
+        except ValueError:
+            stamps = {}
+
+    known = stamps.get(key)
+    if known is not None and all(known.get(k) == v for k, v in stamp.items()):
+        return os.path.join(root, known["hash"])
+
+    digest = net_file_hash(net_file)
+    stamps[key] = {**stamp, "hash": digest}
+
+    # Write then rename so concurrent loaders never read a torn file
+    os.makedirs(root, exist_ok=True)
+    tmp_file = f"{stamps_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(stamps, f, indent=1)
+    os.replace(tmp_file, stamps_file)
+
+    return os.path.join(root, digest)
+
+
+def iter_net_elements(net_file, tags):
+    """Stream (tag, element) pairs of the top-level `tags`, freeing each after use."""
+    root = None
+    depth = 0
+
+    for event, elem in ET.iterparse(net_file, events=("start", "end")):
+        if event == "start":
+            root = elem if root is None else root
+            depth += 1
+            continue
+
+        depth -= 1
+        # depth 1 = direct children of <net>
+        if depth == 1:
+            if elem.tag in tags:
+                yield elem.tag, elem
+            root.clear()
+
+
+def csr(groups, values, num_groups):
+    """(indptr, indices) listing `values` per group id; negative groups are dropped."""
+    keep = groups >= 0
+    groups, values = groups[keep], values[keep]
+
+    order = np.argsort(groups, kind="stable")
+    indptr = np.zeros(num_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(groups, minlength=num_groups), out=indptr[1:])
+
+    return indptr, values[order].astype(np.int64)
+
+
+def lookup(sorted_ids, ids):
+    """Codes of `ids` in the sorted ID array `sorted_ids`; -1 where absent."""
+    ids = np.asarray(ids)
+    if len(sorted_ids) == 0 or len(ids) == 0:
+        return np.full(len(ids), -1, dtype=np.int64)
+
+    pos = np.searchsorted(sorted_ids, ids)
+    pos = np.minimum(pos, len(sorted_ids) - 1)
+    return np.where(sorted_ids[pos] == ids, pos, -1).astype(np.int64)
+
+
+def _parse_shape(shape):
+    if not shape:
+        return []
+    return [tuple(float(v) for v in point.split(",")[:2]) for point in shape.split()]
+
+
+def compile_network(net_file):
+    vclasses = list(VEHICLE_CLASSES)
+    bit_of = {name: i for i, name in enumerate(vclasses)}
+
+    def class_mask(names):
+        """Bitmask of space-separated class names; None for "all"."""
+        mask = 0
+        for name in names.split():
+            if name == "all":
+                return None
+            if name not in bit_of:
+                if len(vclasses) >= 64:
+                    raise ValueError(f"More than 64 vehicle classes in {net_file}")
+                bit_of[name] = len(vclasses)
+                vclasses.append(name)
+            mask |= 1 << bit_of[name]
+        return mask
+
+    edges = []        # (id, from, to, function, type, priority)
+    lanes = []        # (edge id, index, lane id, length, speed, allow, disallow, shape)
+    connections = []  # (from lane, to lane, via lane)
+    junctions = []    # (id, type, x, y)
+
+    for tag, elem in iter_net_elements(net_file, {"edge", "junction", "connection"}):
+        if tag == "edge":
+            edge_id = elem.get("id")
+            edges.append((
+                edge_id, elem.get("from", ""), elem.get("to", ""),
+                elem.get("function", "normal"), elem.get("type", ""),
+                int(elem.get("priority", -1))
+            ))
+            for lane in elem.iter("lane"):
+                lanes.append((
+                    edge_id, int(lane.get("index")), lane.get("id"),
+                    float(lane.get("length")), float(lane.get("speed")),
+                    lane.get("allow"), lane.get("disallow"),
+                    _parse_shape(lane.get("shape"))
+                ))
+
+        elif tag == "junction":
+            junctions.append((
+                elem.get("id"), elem.get("type", ""),
+                float(elem.get("x", "nan")), float(elem.get("y", "nan"))
+            ))
+
+        else:
+            connections.append((
+                f"{elem.get('from')}_{elem.get('fromLane')}",
+                f"{elem.get('to')}_{elem.get('toLane')}",
+                elem.get("via", "")
+            ))
+
+    # ---- edges ----
+    edges.sort()
+    edge_ids = np.array([e[0] for e in edges], dtype=str)
+    edge_function = np.array([e[3] for e in edges], dtype=str)
+
+    junctions.sort()
+    junction_ids = np.array([j[0] for j in junctions], dtype=str)
+
+    # ---- lanes (grouped by edge, by lane index) ----
+    lane_edge = lookup(edge_ids, [l[0] for l in lanes])
+    order = np.lexsort(([l[1] for l in lanes], lane_edge)) if lanes else np.zeros(0, dtype=np.int64)
+    lanes = [lanes[i] for i in order]
+    lane_edge = lane_edge[order]
+
+    lane_ids = np.array([l[2] for l in lanes], dtype=str)
+    lane_order = np.argsort(lane_ids, kind="stable")
+
+    def lane_codes(ids):
+        codes = lookup(lane_ids[lane_order], ids)
+        return np.where(codes >= 0, lane_order[np.maximum(codes, 0)], -1)
+
+    # (allow mask, disallow mask) per lane; the full class set is only
+    # known once every lane was seen
+    raw_masks = [
+        (class_mask(l[5]) if l[5] is not None else None,
+         class_mask(l[6]) if l[6] is not None else 0)
+        for l in lanes
+    ]
+    all_classes = (1 << len(vclasses)) - 1
+
+    def permissions(allow, disallow):
+        allowed = all_classes if allow is None else allow
+        return 0 if disallow is None else allowed & ~disallow
+
+    lane_permissions = np.array(
+        [permissions(*masks) for masks in raw_masks], dtype=np.uint64
+    )
+
+    edge_lane_indptr = np.zeros(len(edge_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(lane_edge, minlength=len(edge_ids)), out=edge_lane_indptr[1:])
+
+    # ---- geometry ----
+    points = [p for l in lanes for p in l[7]]
+    shape_points = np.array(points, dtype=float).reshape(-1, 2)
+    lane_shape_indptr = np.zeros(len(lanes) + 1, dtype=np.int64)
+    np.cumsum([len(l[7]) for l in lanes], out=lane_shape_indptr[1:])
+
+    # ---- connections ----
+    conn_from_lane = lane_codes([c[0] for c in connections])
+    conn_to_lane = lane_codes([c[1] for c in connections])
+    conn_via_lane = lane_codes([c[2] for c in connections])
+
+    # Edge successors between non-internal edges (as sumolib without internals)
+    known = (conn_from_lane >= 0) & (conn_to_lane >= 0)
+    from_edge = lane_edge[conn_from_lane[known]]
+    to_edge = lane_edge[conn_to_lane[known]]
+    regular = (edge_function[from_edge] != "internal") & (edge_function[to_edge] != "internal")
+
+    pairs = np.unique(np.stack([from_edge[regular], to_edge[regular]], axis=1), axis=0)
+    out_indptr, out_indices = csr(pairs[:, 0], pairs[:, 1], len(edge_ids))
+    in_indptr, in_indices = csr(pairs[:, 1], pairs[:, 0], len(edge_ids))
+
+    return {
+        "vclasses": np.array(vclasses, dtype=str),
+        "edge_ids": edge_ids,
+        "edge_from": lookup(junction_ids, [e[1] for e in edges]),
+        "edge_to": lookup(junction_ids, [e[2] for e in edges]),
+        "edge_function": edge_function,
+        "edge_type": np.array([e[4] for e in edges], dtype=str),
+        "edge_priority": np.array([e[5] for e in edges], dtype=np.int64),
+        "edge_lane_indptr": edge_lane_indptr,
+        "lane_ids": lane_ids,
+        "lane_edge": lane_edge,
+        "lane_index": np.array([l[1] for l in lanes], dtype=np.int64),
+        "lane_length": np.array([l[3] for l in lanes]),
+        "lane_speed": np.array([l[4] for l in lanes]),
+        "lane_permissions": lane_permissions,
+        "lane_order": lane_order,
+        "conn_from_lane": conn_from_lane,
+        "conn_to_lane": conn_to_lane,
+        "conn_via_lane": conn_via_lane,
+        "out_indptr": out_indptr,
+        "out_indices": out_indices,
+        "in_indptr": in_indptr,
+        "in_indices": in_indices,
+        "shape_points": shape_points,
+        "lane_shape_indptr": lane_shape_indptr,
+        "junction_ids": junction_ids,
+        "junction_type": np.array([j[1] for j in junctions], dtype=str),
+        "junction_xy": np.array([j[2:] for j in junctions], dtype=float).reshape(-1, 2),
+    }
+
+
+class CompiledNetwork:
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @property
+    def num_edges(self):
+        return len(self.edge_ids)
+
+    @property
+    def num_lanes(self):
+        return len(self.lane_ids)
+
+    # ---- lookup ----
+
+    def edge(self, edge_id):
+        """Code of an edge ID (KeyError if the network has no such edge)."""
+        code = lookup(self.edge_ids, [edge_id])[0]
+        if code < 0:
+            raise KeyError(edge_id)
+        return int(code)
+
+    def edge_codes(self, edge_ids):
+        return lookup(self.edge_ids, edge_ids)
+
+    def lane_codes(self, lane_ids):
+        codes = lookup(self.lane_ids[self.lane_order], lane_ids)
+        return np.where(codes >= 0, self.lane_order[np.maximum(codes, 0)], -1)
+
+    # ---- topology ----
+
+    def special_edges(self):
+        """True for internal / connector / crossing / walking-area edges."""
+        return self.edge_function != "normal"
+
+    def edge_lanes(self, edge):
+        return np.arange(self.edge_lane_indptr[edge], self.edge_lane_indptr[edge + 1])
+
+    def outgoing(self, edge):
+        return self.out_indices[self.out_indptr[edge]:self.out_indptr[edge + 1]]
+
+    def incoming(self, edge):
+        return self.in_indices[self.in_indptr[edge]:self.in_indptr[edge + 1]]
+
+    def out_degree(self):
+        return np.diff(self.out_indptr)
+
+    def in_degree(self):
+        return np.diff(self.in_indptr)
+
+    # ---- junctions ----
+
+    def lane_to_junction(self):
+        """Junction each non-internal lane ends at (-1 = internal lane / none)."""
+        junction = np.asarray(self.edge_to)[self.lane_edge]
+        return np.where(self.edge_function[self.lane_edge] != "internal", junction, -1)
+
+    def lane_from_junction(self):
+        """Junction each non-internal lane starts at (-1 = internal lane / none)."""
+        junction = np.asarray(self.edge_from)[self.lane_edge]
+        return np.where(self.edge_function[self.lane_edge] != "internal", junction, -1)
+
+    def junction_degrees(self):
+        """(incoming lane count, outgoing lane count) per junction."""
+        num_junctions = len(self.junction_ids)
+        incoming = self.lane_to_junction()
+        outgoing = self.lane_from_junction()
+        return (np.bincount(incoming[incoming >= 0], minlength=num_junctions),
+                np.bincount(outgoing[outgoing >= 0], minlength=num_junctions))
+
+    # ---- lane graph ----
+
+    def lane_connections(self):
+        """
+        int64 [E, 2] lane -> lane code pairs, one per connected lane pair
+        (what traci.lane.getLinks reports), including connections that
+        leave internal lanes.
+        """
+        known = (self.conn_from_lane >= 0) & (self.conn_to_lane >= 0)
+        pairs = np.stack([self.conn_from_lane[known], self.conn_to_lane[known]], axis=1)
+        return np.unique(pairs.reshape(-1, 2), axis=0)
+
+    # ---- permissions / geometry ----
+
+    def class_bit(self, vclass):
+        return np.uint64(1) << np.uint64(list(self.vclasses).index(vclass))
+
+    def lane_permissions_of(self, lane):
+        mask = int(self.lane_permissions[lane])
+        return {str(c) for i, c in enumerate(self.vclasses) if mask >> i & 1}
+
+    def lanes_allowing(self, vclass):
+        return (self.lane_permissions & self.class_bit(vclass)) != 0
+
+    def edges_allowing(self, vclass):
+        """True for edges with at least one lane open to `vclass`."""
+        allowed = self.lanes_allowing(vclass)
+        return np.bincount(self.lane_edge[allowed], minlength=self.num_edges) > 0
+
+    def lane_shape(self, lane):
+        return self.shape_points[self.lane_shape_indptr[lane]:self.lane_shape_indptr[lane + 1]]
+
+
+def load_compiled_network(net_file=NET_FILE, root=COMPILED_ROOT, rebuild=False):
+    """Compile `net_file` on first use (or when it changed), then memory-map the cache."""
+    path = cache_dir(net_file, root)
+    meta_file = os.path.join(path, "meta.json")
+
+    if rebuild or not os.path.exists(meta_file):
+        arrays = compile_network(net_file)
+
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), arrays[name])
+
+        # Written last: marks the cache as complete
+        with open(meta_file, "w") as f:
+            json.dump({
+                "net_file": net_file,
+                "hash": os.path.basename(path),
+                **file_stamp(net_file),
+                "edges": len(arrays["edge_ids"]),
+                "lanes": len(arrays["lane_ids"]),
+                "connections": len(arrays["conn_from_lane"]),
+                "junctions": len(arrays["junction_ids"]),
+            }, f)
+
+    with open(meta_file) as f:
+        meta = json.load(f)
+
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        for name in ARRAYS
+    }
+    return CompiledNetwork(arrays, meta)
+
+
+if __name__ == "__main__":
+    net = load_compiled_network(rebuild=True)
+    print(f"[PASS] Compiled {NET_FILE}: {net.meta['edges']} edges, "
+          f"{net.meta['lanes']} lanes, {net.meta['connections']} connections, "
+          f"{net.meta['junctions']} junctions")
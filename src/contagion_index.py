@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+Uniform-grid spatial hash of recent violations for the contagion check.
+
+Cells are ``radius`` wide, so any event closer than ``radius`` to a point
+lies in the point's cell or one of its 8 neighbours. Events are kept in a
+ring buffer of ``duration + 1`` time buckets; advancing to a new step
+clears the bucket that falls out of the window, which reproduces the
+``step - event_time <= duration`` expiry of the original list filter.
+"""
+
+import math
+import numpy as np
+
+
+class ContagionIndex:
+
+    def __init__(self, radius, duration):
+        self.radius = radius
+        self.duration = duration
+        self.buckets = [{} for _ in range(duration + 1)]
+        self.bucket_steps = [None] * (duration + 1)
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.radius), math.floor(y / self.radius))
+
+    def advance(self, step):
+        # Drop every event older than `duration` steps
+        for i, bucket_step in enumerate(self.bucket_steps):
+            if bucket_step is not None and step - bucket_step > self.duration:
+                self.buckets[i].clear()
+                self.bucket_steps[i] = None
+
+    def add(self, step, x, y):
+        slot = step % len(self.buckets)
+
+        if self.bucket_steps[slot] != step:
+            self.buckets[slot].clear()
+            self.bucket_steps[slot] = step
+
+        self.buckets[slot].setdefault(self._cell(x, y), []).append((x, y))
+
+    def is_near(self, x, y):
+        cx, cy = self._cell(x, y)
+
+        for bucket in self.buckets:
+            if not bucket:
+                continue
+
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for ex, ey in bucket.get((cx + dx, cy + dy), ()):
+                        if math.hypot(x - ex, y - ey) < self.radius:
+                            return True
+
+        return False
+
+    def near_mask(self, xs, ys):
+        """
+        Vectorized is_near() over arrays of positions. Only vehicles whose
+        3x3 cell neighbourhood holds an event get the exact distance check.
+        """
+        mask = np.zeros(len(xs), dtype=bool)
+
+        occupied = {cell for bucket in self.buckets for cell in bucket}
+        if not occupied or len(xs) == 0:
+            return mask
+
+        cx = np.floor(np.asarray(xs) / self.radius).astype(np.int64)
+        cy = np.floor(np.asarray(ys) / self.radius).astype(np.int64)
+
+        occupied_keys = np.array(
+            [_cell_key(ox, oy) for ox, oy in occupied], dtype=np.int64
+        )
+
+        candidate = np.zeros(len(xs), dtype=bool)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                candidate |= np.isin(_cell_key(cx + dx, cy + dy), occupied_keys)
+
+        for i in np.flatnonzero(candidate):
+            mask[i] = self.is_near(xs[i], ys[i])
+
+        return mask
+
+    def events(self):
+        """All live events as (step, x, y), e.g. for checkpointing."""
+        return [
+            (bucket_step, x, y)
+            for bucket, bucket_step in zip(self.buckets, self.bucket_steps)
+            if bucket_step is not None
+            for events in bucket.values()
+            for x, y in events
+        ]
+
+    def __len__(self):
+        return sum(
+            len(events) for bucket in self.buckets for events in bucket.values()
+        )
+
+
+def _cell_key(cx, cy):
+    # Pack a 2D cell coordinate into one int64 (valid for |cy| < 2**31)
+    return cx * 4294967296 + cy
@@ -3,8 +3,40 @@
 import xml.etree.ElementTree as ET
 import os
 
+from select_zones import ZONE_FILE, load_zone_file
 
-def create_peak_flow(route_path):
+# Fallback origin / destination when no zone file has been written
+ENTRY_EDGE = "239840578#0"
+CORE_EDGE = "-1030313018#1"
+
+# Peak demand per vehicle type, split evenly across the entry zones
+PEAK_DEMAND = {"car": 900, "bike": 1200}
+
+
+def od_routes(zone_file=ZONE_FILE):
+    """
+    (entry, via, exit) triples from the zone file (see select_zones.py):
+    each entry zone sends its traffic through one core zone to one exit
+    zone, both assigned round-robin (core zones in centrality order).
+    Falls back to the single ENTRY_EDGE -> CORE_EDGE trip (via = None).
+    """
+    if os.path.exists(zone_file):
+        zones = load_zone_file(zone_file)
+        cores = [zone["edge"] for zone in zones["core"]]
+        exits = zones["exit"]
+
+        if zones["entry"] and cores and exits:
+            return [
+                (entry, cores[i % len(cores)], exits[i % len(exits)])
+                for i, entry in enumerate(zones["entry"])
+            ]
+
+        print(f"[WARN] {zone_file} has no entry, core or exit zones, using the default trip")
+
+    return [(ENTRY_EDGE, None, CORE_EDGE)]
+
+
+def create_peak_flow(route_path, zone_file=ZONE_FILE):
 
     routes = ET.Element("routes")
 
@@ -26,32 +58,27 @@ def create_peak_flow(route_path):
         "sigma": "0.7"
     })
 
-    ENTRY_EDGE = "239840578#0"
-    CORE_EDGE = "-1030313018#1"
-
-    ET.SubElement(routes, "flow", {
-        "id": "morning_cars",
-        "type": "car",
-        "begin": "0",
-        "end": "3600",
-        "vehsPerHour": "900",
-        "from": ENTRY_EDGE,
-        "to": CORE_EDGE
-    })
+    trips = od_routes(zone_file)
 
-    ET.SubElement(routes, "flow", {
-        "id": "morning_bikes",
-        "type": "bike",
-        "begin": "0",
-        "end": "3600",
-        "vehsPerHour": "1200",
-        "from": ENTRY_EDGE,
-        "to": CORE_EDGE
-    })
+    for vtype, name in (("car", "morning_cars"), ("bike", "morning_bikes")):
+        vehs_per_hour = PEAK_DEMAND[vtype] / len(trips)
+
+        for i, (entry, via, exit_edge) in enumerate(trips):
+            flow = ET.SubElement(routes, "flow", {
+                "id": name if len(trips) == 1 else f"{name}_{i}",
+                "type": vtype,
+                "begin": "0",
+                "end": "3600",
+                "vehsPerHour": f"{vehs_per_hour:g}",
+                "from": entry,
+                "to": exit_edge
+            })
+            if via is not None:
+                flow.set("via", via)
 
     tree = ET.ElementTree(routes)
     tree.write(route_path)
-    print(f"[PASS] Route file created at {route_path}")
+    print(f"[PASS] Route file created at {route_path} ({len(trips)} origin-destination trips)")
 
 
 if __name__ == "__main__":
@@ -1,18 +1,19 @@
 # -*- coding: utf-8 -*-
 
 
-import sumolib
+from compiled_network import load_compiled_network
 
 NET_FILE = "data/sumo_network/hinjewadi_phase3.net.xml"
 
-net = sumolib.net.readNet(NET_FILE)
+net = load_compiled_network(NET_FILE)
 
 edge_id = "-1151423646#1"  # change if needed
-edge = net.getEdge(edge_id)
+edge = net.edge(edge_id)
+lanes = net.edge_lanes(edge)
 
-print("Edge ID:", edge.getID())
-print("Number of lanes:", len(edge.getLanes()))
+print("Edge ID:", net.edge_ids[edge])
+print("Number of lanes:", len(lanes))
 
-for lane in edge.getLanes():
-    print("Lane ID:", lane.getID())
-    print("Permissions:", lane.getPermissions())
\ No newline at end of file
+for lane in lanes:
+    print("Lane ID:", net.lane_ids[lane])
+    print("Permissions:", net.lane_permissions_of(lane))
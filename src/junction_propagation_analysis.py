@@ -1,89 +1,99 @@
 # -*- coding: utf-8 -*-
 
 import pandas as pd
-import traci
 import numpy as np
 import os
 
-NET_FILE = "data/sumo_network/hinjewadi_phase3.net.xml"
-LOG_FILE = "data/logs/vehicle_log.csv"
+from compiled_network import load_compiled_network
+from vehicle_log import load_vehicle_log
+from log_aggregation import add_indicators, group_rates
+from lag_correlation import series_matrix, best_lag, MAX_LAG
 
-print("Loading SUMO network...")
-traci.start(["sumo", "-n", NET_FILE, "--quit-on-end"])
+NET_FILE = "data/sumo_network/hinjewadi_phase3.net.xml"
 
-junctions = traci.junction.getIDList()
 
-junction_map = {}
+def junction_steps(lane_steps, lane_to_junction):
+    """
+    Per (junction, time) rates from per (lane code, time) rates, through a
+    lane -> junction incidence array (-1 = no junction).
+    """
+    junction = lane_to_junction[lane_steps["lane_code"].to_numpy()]
+    keep = junction >= 0
 
-for j in junctions:
-    incoming = traci.junction.getIncomingEdges(j)
-    outgoing = traci.junction.getOutgoingEdges(j)
+    sums = lane_steps[keep].assign(junction=junction[keep]).groupby(
+        ["junction", "time"]
+    )[["vehicle_count", "violation_count", "congested_count"]].sum()
 
-    incoming_lanes = []
-    outgoing_lanes = []
+    sums["violation_rate"] = sums["violation_count"] / sums["vehicle_count"]
+    sums["congestion_ratio"] = sums["congested_count"] / sums["vehicle_count"]
+    return sums
 
-    for edge in incoming:
-        for i in range(traci.edge.getLaneNumber(edge)):
-            incoming_lanes.append(f"{edge}_{i}")
 
-    for edge in outgoing:
-        for i in range(traci.edge.getLaneNumber(edge)):
-            outgoing_lanes.append(f"{edge}_{i}")
+print("Loading compiled network...")
+net = load_compiled_network(NET_FILE)
 
-    if incoming_lanes and outgoing_lanes:
-        junction_map[j] = {
-            "incoming": incoming_lanes,
-            "outgoing": outgoing_lanes
-        }
+# Only junctions with both incoming and outgoing lanes
+incoming_degree, outgoing_degree = net.junction_degrees()
+through = (incoming_degree > 0) & (outgoing_degree > 0)
 
-traci.close()
+lane_to_junction = net.lane_to_junction()
+lane_to_junction = np.where((lane_to_junction >= 0) & through[lane_to_junction],
+                            lane_to_junction, -1)
+lane_from_junction = net.lane_from_junction()
+lane_from_junction = np.where((lane_from_junction >= 0) & through[lane_from_junction],
+                              lane_from_junction, -1)
 
 print("Loading log file...")
-df = pd.read_csv(LOG_FILE)
-
-results = []
+df = add_indicators(load_vehicle_log())
 
 print("\nAnalyzing junction propagation...\n")
 
-for j, lanes in junction_map.items():
+# Integer lane codes, looked up once per distinct lane ID; lanes inside
+# junctions (internal lanes) map to no junction
+lane_ids = df["lane_id"].astype("category")
+df["lane_code"] = net.lane_codes(lane_ids.cat.categories.astype(str))[lane_ids.cat.codes]
 
-    inc_df = df[df["lane_id"].isin(lanes["incoming"])]
-    out_df = df[df["lane_id"].isin(lanes["outgoing"])]
+# One group-by over the whole log, then lanes -> junctions via the index
+lane_steps = group_rates(df[df["lane_code"] >= 0], ["lane_code", "time"]).reset_index()
+lane_steps["congested_count"] = lane_steps["congestion_ratio"] * lane_steps["vehicle_count"]
 
-    # Lower threshold dramatically
-    if len(inc_df) < 100 or len(out_df) < 100:
-        continue
+# Incoming lanes end at the junction, outgoing lanes start there
+inc_steps = junction_steps(lane_steps, lane_to_junction)
+out_steps = junction_steps(lane_steps, lane_from_junction)
 
-    inc_group = inc_df.groupby("time").agg(
-        violation_rate=("violation_type", lambda x: (x != "none").mean())
-    )
+# Lower threshold dramatically
+inc_rows = inc_steps["vehicle_count"].groupby(level=0).sum()
+out_rows = out_steps["vehicle_count"].groupby(level=0).sum()
+candidates = sorted(
+    set(inc_rows.index[inc_rows >= 100]) & set(out_rows.index[out_rows >= 100])
+)
 
-    out_group = out_df.groupby("time").agg(
-        congestion_ratio=("speed", lambda x: (x < 1).mean())
-    )
+t_min, t_max = int(df["time"].min()), int(df["time"].max())
 
-    merged = inc_group.join(out_group, how="inner").dropna()
+results = []
 
-    if len(merged) < 30:
-        continue
+if candidates:
+    inc_keys, violation_rate = series_matrix(
+        inc_steps.loc[candidates], "violation_rate", t_min, t_max
+    )
+    out_keys, congestion_ratio = series_matrix(
+        out_steps.loc[candidates], "congestion_ratio", t_min, t_max
+    )
 
-    max_lag = 30
-    best_lag = None
-    best_corr = 0
+    # Align both [junction, time] arrays on the candidate order
+    violation_rate = violation_rate[[inc_keys.index(j) for j in candidates]]
+    congestion_ratio = congestion_ratio[[out_keys.index(j) for j in candidates]]
 
-    for lag in range(1, max_lag + 1):
-        shifted_cong = merged["congestion_ratio"].shift(-lag)
-        corr = merged["violation_rate"].corr(shifted_cong)
+    # Timesteps with data on both sides
+    shared_steps = (np.isfinite(violation_rate) & np.isfinite(congestion_ratio)).sum(axis=1)
 
-        if abs(corr) > abs(best_corr):
-            best_corr = corr
-            best_lag = lag
+    lags, corrs = best_lag(violation_rate, congestion_ratio, MAX_LAG)
 
-    results.append({
-        "junction": j,
-        "best_lag": best_lag,
-        "correlation": best_corr
-    })
+    results = [
+        {"junction": str(net.junction_ids[j]), "best_lag": lag, "correlation": corr}
+        for j, n, lag, corr in zip(candidates, shared_steps, lags, corrs)
+        if n >= 30 and not np.isnan(corr)
+    ]
 
 if not results:
     print("No qualifying junctions found.")
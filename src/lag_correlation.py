@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lagged Pearson correlation for many time series at once.
+
+Series are rows of a dense [series, time] array on a common 1 s time
+axis, with NaN where a series has no observation (e.g. a lane without
+vehicles at that step). For every lag, corr(x[t], y[t + lag]) is computed
+over the pairs where both values exist, as pandas' Series.corr does, with
+one vectorized pass over all series instead of one Python call per
+series and lag. Lags are therefore real seconds, even across gaps.
+"""
+
+import numpy as np
+
+MAX_LAG = 30  # seconds
+MIN_PERIODS = 2
+
+
+def series_matrix(rates, column, t_min=None, t_max=None):
+    """
+    (keys, [len(keys), T] array) from a (key, time)-indexed frame such as
+    group_rates(df, [key, "time"]); missing timesteps are NaN.
+    """
+    wide = rates[column].unstack("time")
+
+    times = wide.columns.astype(int)
+    t_min = times.min() if t_min is None else t_min
+    t_max = times.max() if t_max is None else t_max
+    wide = wide.reindex(columns=range(t_min, t_max + 1))
+
+    return wide.index.tolist(), wide.to_numpy(dtype=float)
+
+
+def lagged_correlation(x, y, max_lag=MAX_LAG, min_periods=MIN_PERIODS):
+    """
+    [S, max_lag] correlations of x[s, t] with y[s, t + lag], lag = 1..max_lag,
+    for [S, T] (or [T]) arrays x and y. NaN where fewer than `min_periods`
+    pairs overlap or either side is constant.
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    num_series, num_steps = x.shape
+
+    out = np.full((num_series, max_lag), np.nan)
+
+    for lag in range(1, min(max_lag, num_steps - 1) + 1):
+        a = x[:, :num_steps - lag]
+        b = y[:, lag:]
+
+        valid = np.isfinite(a) & np.isfinite(b)
+        n = valid.sum(axis=1)
+        safe_n = np.maximum(n, 1)
+
+        a = np.where(valid, a, 0.0)
+        b = np.where(valid, b, 0.0)
+
+        # Centre on the overlapping pairs only (two-pass, like pandas)
+        da = np.where(valid, a - (a.sum(axis=1) / safe_n)[:, None], 0.0)
+        db = np.where(valid, b - (b.sum(axis=1) / safe_n)[:, None], 0.0)
+
+        cov = (da * db).sum(axis=1)
+        var_a = (da * da).sum(axis=1)
+        var_b = (db * db).sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = cov / np.sqrt(var_a * var_b)
+
+        r[(n < min_periods) | (var_a == 0) | (var_b == 0)] = np.nan
+        out[:, lag - 1] = np.clip(r, -1.0, 1.0)
+
+    return out
+
+
+def best_lag(x, y, max_lag=MAX_LAG, min_periods=MIN_PERIODS):
+    """
+    (lag, correlation) per series with the largest |correlation| over
+    lags 1..max_lag; the smallest such lag wins ties. Both are NaN for
+    series without any valid lag.
+    """
+    corr = lagged_correlation(x, y, max_lag, min_periods)
+
+    strength = np.where(np.isnan(corr), -1.0, np.abs(corr))
+    best = strength.argmax(axis=1)
+    found = strength.max(axis=1) >= 0
+
+    rows = np.arange(len(corr))
+    lags = np.where(found, best + 1.0, np.nan)
+    values = np.where(found, corr[rows, best], np.nan)
+
+    return lags, values
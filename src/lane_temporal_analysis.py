@@ -2,16 +2,22 @@
 
 import pandas as pd
 import numpy as np
+import os
 
-LOG_FILE = "data/logs/vehicle_log.csv"
+from vehicle_log import load_vehicle_log
+from log_aggregation import add_indicators, group_rates
+from lag_correlation import series_matrix, best_lag, MAX_LAG
+
+RESULTS_FILE = "results/lane_temporal_results.csv"
+
+# Lanes observed on fewer timesteps are not analyzed
+MIN_OBSERVED_STEPS = 50
 
 print("Loading data...")
-df = pd.read_csv(LOG_FILE)
+df = add_indicators(load_vehicle_log())
 
 # Identify top 5 congested lanes
-lane_summary = df.groupby("lane_id").agg(
-    congestion_ratio=("speed", lambda x: (x < 1).mean())
-)
+lane_summary = group_rates(df, "lane_id")
 
 top_lanes = lane_summary.sort_values(
     "congestion_ratio", ascending=False
@@ -23,39 +29,43 @@ for lane in top_lanes:
 
 print("\nAnalyzing temporal causality per lane...\n")
 
-for lane in top_lanes:
+# [lane, time] series on a shared 1 s axis; NaN where a lane had no vehicles
+lane_steps = group_rates(df, ["lane_id", "time"])
+t_min, t_max = int(df["time"].min()), int(df["time"].max())
+
+lanes, violation_rate = series_matrix(lane_steps, "violation_rate", t_min, t_max)
+_, mean_speed = series_matrix(lane_steps, "mean_speed", t_min, t_max)
 
-    lane_df = df[df["lane_id"] == lane]
+lags, corrs = best_lag(violation_rate, mean_speed, MAX_LAG)
 
-    grouped = lane_df.groupby("time").agg(
-        mean_speed=("speed", "mean"),
-        violation_count=("violation_type", lambda x: (x != "none").sum()),
-        vehicle_count=("vehicle_id", "count")
-    )
+results = pd.DataFrame({
+    "lane_id": lanes,
+    "observed_steps": np.isfinite(mean_speed).sum(axis=1),
+    "best_lag": lags,
+    "correlation": corrs,
+}).set_index("lane_id")
 
-    grouped["violation_rate"] = (
-        grouped["violation_count"] / grouped["vehicle_count"]
-    )
+# Skip lanes without enough data
+results.loc[results["observed_steps"] < MIN_OBSERVED_STEPS, ["best_lag", "correlation"]] = np.nan
 
-    grouped = grouped.dropna()
+for lane in top_lanes:
+    row = results.loc[lane]
 
-    # Skip if not enough data
-    if len(grouped) < 50:
+    if np.isnan(row["correlation"]):
         print(f"\nLane {lane}: Not enough data")
         continue
 
-    max_lag = 30
-    best_lag = None
-    best_corr = 0
-
-    for lag in range(1, max_lag + 1):
-        shifted_speed = grouped["mean_speed"].shift(-lag)
-        corr = grouped["violation_rate"].corr(shifted_speed)
-
-        if abs(corr) > abs(best_corr):
-            best_corr = corr
-            best_lag = lag
-
     print(f"\nLane: {lane}")
-    print(f"  Best Lag: {best_lag} seconds")
-    print(f"  Lag Correlation: {round(best_corr, 4)}")
\ No newline at end of file
+    print(f"  Best Lag: {int(row['best_lag'])} seconds")
+    print(f"  Lag Correlation: {round(row['correlation'], 4)}")
+
+analyzed = results.dropna(subset=["correlation"])
+print(f"\nLanes analyzed: {len(analyzed)} of {len(results)}")
+print("\nStrongest lag correlations (all lanes):\n")
+print(analyzed.reindex(
+    analyzed["correlation"].abs().sort_values(ascending=False).index
+).head(10))
+
+os.makedirs("results", exist_ok=True)
+results.to_csv(RESULTS_FILE)
+print(f"\nSaved to {RESULTS_FILE}")
@@ -1,22 +1,18 @@
 # -*- coding: utf-8 -*-
 
-import sumolib
+from compiled_network import load_compiled_network
 
 NET_FILE = "data/sumo_network/hinjewadi_phase3.net.xml"
 
-net = sumolib.net.readNet(NET_FILE)
+net = load_compiled_network(NET_FILE)
 
 print("Listing drivable edges...\n")
 
-edges = []
-
-for edge in net.getEdges():
-    # skip internal edges (junction connectors)
-    if not edge.isSpecial():
-        edges.append(edge.getID())
+# skip internal edges (junction connectors)
+edges = net.edge_ids[~net.special_edges()]
 
 print(f"Total usable edges: {len(edges)}\n")
 
 # Print first 20 edges
 for e in edges[:20]:
-    print(e)
\ No newline at end of file
+    print(e)
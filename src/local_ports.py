@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+"""
+Free localhost ports for the processes a script starts itself (SUMO's
+TraCI server, the torch.distributed rendezvous).
+"""
+
+import socket
+
+
+def free_port():
+    """A port that is free right now (the OS picks it; not reserved)."""
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
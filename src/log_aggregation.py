@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared vectorized aggregations over the vehicle log.
+
+Violation and congestion rates are computed from boolean indicator
+columns added once per frame, so every group reduction is a built-in
+sum / mean instead of a Python lambda called once per group. The dense
+lane x time kernel uses np.bincount over integer-coded keys.
+"""
+
+import numpy as np
+
+CONGESTION_SPEED_THRESHOLD = 1.0  # m/s
+
+
+def add_indicators(df):
+    """Add is_violation / is_congested columns (in place) and return df."""
+    df["is_violation"] = (df["violation_type"] != "none").to_numpy()
+    df["is_congested"] = (df["speed"] < CONGESTION_SPEED_THRESHOLD).to_numpy()
+    return df
+
+
+def group_rates(df, by):
+    """
+    Per-group log statistics:
+    mean_speed, vehicle_count, violation_count, violation_rate, congestion_ratio.
+    """
+    if "is_violation" not in df:
+        add_indicators(df)
+
+    return df.groupby(by, observed=True).agg(
+        mean_speed=("speed", "mean"),
+        vehicle_count=("speed", "size"),
+        violation_count=("is_violation", "sum"),
+        violation_rate=("is_violation", "mean"),
+        congestion_ratio=("is_congested", "mean"),
+    )
+
+
+def dense_lane_time_sums(time, lane_codes, speed, is_violation, t0, span, num_lanes):
+    """
+    Per (timestep, lane) vehicle count, speed sum and violation count as
+    dense [span, num_lanes] arrays, for timesteps t0 .. t0 + span - 1.
+    """
+    key = (np.asarray(time) - t0) * num_lanes + np.asarray(lane_codes)
+    size = span * num_lanes
+    shape = (span, num_lanes)
+
+    count = np.bincount(key, minlength=size).reshape(shape)
+    speed_sum = np.bincount(key, weights=speed, minlength=size).reshape(shape)
+    violations = np.bincount(key, weights=is_violation, minlength=size).reshape(shape)
+
+    return count, speed_sum, violations
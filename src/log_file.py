@@ -1,21 +1,14 @@
 # -*- coding: utf-8 -*-
 
-import pandas as pd
 import numpy as np
 
-df = pd.read_csv("./data/logs/vehicle_log.csv")
-
-grouped = df.groupby("time")
+from vehicle_log import load_vehicle_log
+from log_aggregation import group_rates
+from lag_correlation import best_lag, MAX_LAG
 
-per_step = grouped.agg(
-    mean_speed=("speed", "mean"),
-    violation_count=("violation_type", lambda x: (x != "none").sum()),
-    vehicle_count=("vehicle_id", "count")
-)
+df = load_vehicle_log()
 
-# Safe division
-per_step["violation_rate"] = per_step["violation_count"] / per_step["vehicle_count"]
-per_step = per_step.dropna()
+per_step = group_rates(df, "time").dropna()
 
 print("Mean violation rate:", per_step["violation_rate"].mean())
 
@@ -23,19 +16,13 @@ print("Mean violation rate:", per_step["violation_rate"].mean())
 corr = per_step["violation_rate"].corr(per_step["mean_speed"])
 print("Instantaneous correlation:", corr)
 
-# Lag correlation
-max_lag = 30
-best_lag = None
-best_corr = 0
+# Lag correlation (lags in seconds; steps without vehicles are gaps)
+per_step = per_step.reindex(range(int(per_step.index.min()), int(per_step.index.max()) + 1))
 
-for lag in range(1, max_lag + 1):
-    shifted_speed = per_step["mean_speed"].shift(-lag)
-    c = per_step["violation_rate"].corr(shifted_speed)
-    if abs(c) > abs(best_corr):
-        best_corr = c
-        best_lag = lag
+lags, corrs = best_lag(per_step["violation_rate"], per_step["mean_speed"], MAX_LAG)
+best_lag_s, best_corr = lags[0], corrs[0]
 
-print("Best lag:", best_lag)
+print("Best lag:", None if np.isnan(best_lag_s) else int(best_lag_s))
 print("Lag correlation:", best_corr)
 
 import pandas as pd
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+"""
+Online congestion prediction from a saved WorldModel, one simulation step
+at a time.
+
+The last WINDOW steps of lane features are kept in a ring buffer, but the
+window is never re-run: each step does one graph convolution for the new
+step only. The LSTM runs in one of two modes:
+
+* ``window``    - exact. One LSTM cell update for WINDOW staggered chains at
+                  once: chain k started k steps ago from a zero state, as in
+                  training. The chain that has seen WINDOW steps gives the
+                  prediction and restarts on the next step. Matches
+                  WorldModel.forward over the buffered window, but still
+                  costs WINDOW x lanes cell updates per step; only the
+                  graph convolution is saved.
+* ``streaming`` - one hidden state per lane, carried across windows: lanes
+                  cell updates per step, WINDOW times less LSTM work, but
+                  the state is never reset, so predictions drift from the
+                  windowed model the longer the run.
+
+The latency budget is enforced: after BUDGET_STRIKES consecutive steps over
+budget, a ``window`` predictor falls back to ``streaming``, starting from
+the state of the chain that just completed a full window.
+
+Run as a script to replay the world-state tensor through the predictor,
+check it against the full model and report p50/p99 step latency.
+"""
+
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+
+from log_aggregation import dense_lane_time_sums
+from world_model import MODEL_FILE, load_world_model
+
+# Per-step time the predictor should stay within when run in-loop
+LATENCY_BUDGET_MS = 10.0
+
+# "window" (exact) or "streaming" (one carried state per lane)
+PREDICTION_MODES = ("window", "streaming")
+PREDICTION_MODE = "window"
+
+# Consecutive over-budget steps before "window" falls back to "streaming"
+BUDGET_STRIKES = 3
+
+
+def lane_step_features(lane_codes, speed, is_violation, num_lanes):
+    """
+    [N, 3] mean_speed / vehicle_count / violation_rate for one step, as
+    build_world_state_tensor.py computes them. Rows with a negative lane
+    code (lanes the model does not know) are ignored.
+    """
+    lane_codes = np.asarray(lane_codes, dtype=np.int64)
+    known = lane_codes >= 0
+
+    count, speed_sum, violations = dense_lane_time_sums(
+        np.zeros(known.sum(), dtype=np.int64),
+        lane_codes[known],
+        np.asarray(speed, dtype=float)[known],
+        np.asarray(is_violation, dtype=float)[known],
+        0, 1, num_lanes
+    )
+    count, speed_sum, violations = count[0], speed_sum[0], violations[0]
+
+    safe = np.maximum(count, 1)
+    return np.stack([
+        np.where(count > 0, speed_sum / safe, 0.0),
+        count.astype(float),
+        np.where(count > 0, violations / safe, 0.0),
+    ], axis=1)
+
+
+class CongestionPredictor:
+
+    def __init__(self, path=MODEL_FILE, device="cpu", latency_budget_ms=LATENCY_BUDGET_MS,
+                 mode=PREDICTION_MODE, budget_strikes=BUDGET_STRIKES):
+        if mode not in PREDICTION_MODES:
+            raise ValueError(f"Unknown prediction mode: {mode}")
+
+        self.initial_mode = mode
+        self.budget_strikes = budget_strikes
+        self.device = torch.device(device)
+        self.model, meta = load_world_model(path, self.device)
+
+        self.window = meta["window"]
+        self.lanes = meta["lanes"]
+        self.lane_to_idx = {lane: i for i, lane in enumerate(self.lanes)}
+        self.num_lanes = len(self.lanes)
+        self.latency_budget_ms = latency_budget_ms
+
+        self.mean = torch.tensor(meta["feature_mean"], device=self.device)
+        self.std = torch.tensor(meta["feature_std"], device=self.device)
+
+        # Same weights as the model's nn.LSTM, one step at a time
+        hidden_dim = self.model.hidden_dim
+        self.cell = nn.LSTMCell(hidden_dim, hidden_dim).to(self.device)
+        lstm = self.model.lstm
+        self.cell.weight_ih.data.copy_(lstm.weight_ih_l0.data)
+        self.cell.weight_hh.data.copy_(lstm.weight_hh_l0.data)
+        self.cell.bias_ih.data.copy_(lstm.bias_ih_l0.data)
+        self.cell.bias_hh.data.copy_(lstm.bias_hh_l0.data)
+
+        self.reset()
+
+    def reset(self):
+        W, N, H = self.window, self.num_lanes, self.model.hidden_dim
+        chains = W if self.initial_mode == "window" else 1
+
+        self.mode = self.initial_mode
+        self.buffer = torch.zeros(W, N, self.mean.numel(), device=self.device)
+        self.h = torch.zeros(chains * N, H, device=self.device)
+        self.c = torch.zeros(chains * N, H, device=self.device)
+        self.steps_seen = 0
+        self.latencies_ms = []
+        self.strikes = 0
+        self.fallback_step = None
+
+    def lane_codes(self, lane_ids):
+        return np.fromiter(
+            (self.lane_to_idx.get(lane, -1) for lane in lane_ids), np.int64, len(lane_ids)
+        )
+
+    @torch.no_grad()
+    def step(self, features):
+        """
+        Feed one step of raw lane features [N, F]. Returns the congestion
+        probability of every lane, or None until WINDOW steps were seen.
+        """
+        started = time.perf_counter()
+        W, N = self.window, self.num_lanes
+
+        x = torch.tensor(np.asarray(features), dtype=torch.float32, device=self.device)
+        x = (x - self.mean) / self.std
+
+        slot = self.steps_seen % W
+        self.buffer[slot] = x
+
+        spatial = self.model.spatial(x[None, None])[0, 0]  # [N, H]
+        probs = None
+
+        if self.mode == "window":
+            # A new chain starts in this slot from a zero state
+            rows = slice(slot * N, (slot + 1) * N)
+            self.h[rows] = 0.0
+            self.c[rows] = 0.0
+
+            self.h, self.c = self.cell(spatial.repeat(W, 1), (self.h, self.c))
+            self.steps_seen += 1
+
+            # The chain that started W steps ago has now seen a full window
+            done = self.steps_seen % W
+            last_hidden = self.h[done * N:(done + 1) * N]
+        else:
+            self.h, self.c = self.cell(spatial, (self.h, self.c))
+            self.steps_seen += 1
+            last_hidden = self.h
+
+        if self.steps_seen >= W:
+            probs = torch.sigmoid(self.model.fc(last_hidden)).squeeze(1).cpu().numpy()
+
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        self.latencies_ms.append(latency_ms)
+        self._enforce_budget(latency_ms)
+        return probs
+
+    def _enforce_budget(self, latency_ms):
+        self.strikes = self.strikes + 1 if latency_ms > self.latency_budget_ms else 0
+
+        if self.mode == "window" and self.strikes >= self.budget_strikes:
+            self.fall_back()
+
+    def fall_back(self):
+        """Switch to streaming, continuing from the most advanced chain."""
+        N = self.num_lanes
+        oldest = self.steps_seen % self.window
+        rows = slice(oldest * N, (oldest + 1) * N)
+
+        self.h = self.h[rows].clone()
+        self.c = self.c[rows].clone()
+        self.mode = "streaming"
+        self.fallback_step = self.steps_seen
+        self.strikes = 0
+
+    def observe(self, lane_ids, speed, is_violation):
+        """step() from the per-vehicle arrays of one simulation step."""
+        features = lane_step_features(
+            self.lane_codes(lane_ids), speed, is_violation, self.num_lanes
+        )
+        return self.step(features)
+
+    @torch.no_grad()
+    def recompute(self):
+        """Full-window forward pass over the ring buffer (oldest step first)."""
+        order = (self.steps_seen + np.arange(self.window)) % self.window
+        window = self.buffer[torch.as_tensor(order, device=self.device)]
+        return torch.sigmoid(self.model(window[None]))[0].cpu().numpy()
+
+    def latency_report(self):
+        latencies = np.asarray(self.latencies_ms)
+        if len(latencies) == 0:
+            return {"steps": 0}
+
+        return {
+            "mode": self.mode,
+            "fallback_step": self.fallback_step,
+            "steps": len(latencies),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "max_ms": float(latencies.max()),
+            "over_budget": int((latencies > self.latency_budget_ms).sum()),
+            "budget_ms": self.latency_budget_ms,
+        }
+
+
+def print_latency_report(report):
+    if report["steps"] == 0:
+        print("Prediction latency: no steps")
+        return
+
+    print(f"Prediction latency over {report['steps']} steps: "
+          f"p50 {report['p50_ms']:.2f} ms | p99 {report['p99_ms']:.2f} ms | "
+          f"max {report['max_ms']:.2f} ms | "
+          f"{report['over_budget']} over the {report['budget_ms']:.1f} ms budget")
+
+    if report.get("fallback_step") is not None:
+        print(f"[WARN] Over budget: fell back to streaming predictions at step "
+              f"{report['fallback_step']}")
+
+
+if __name__ == "__main__":
+    from world_state import load_world_state
+
+    predictor = CongestionPredictor()
+    features, _, manifest = load_world_state()
+
+    if manifest["lanes"] != predictor.lanes:
+        raise ValueError("World-state lanes differ from the lanes the model was trained on")
+
+    print(f"Replaying {features.shape[0]} steps over {predictor.num_lanes} lanes "
+          f"(window {predictor.window})...")
+
+    max_diff = 0.0
+    for t in range(features.shape[0]):
+        probs = predictor.step(features[t])
+        # Only the window mode is exact
+        if probs is not None and predictor.mode == "window":
+            max_diff = max(max_diff, float(np.abs(probs - predictor.recompute()).max()))
+
+    print_latency_report(predictor.latency_report())
+
+    if max_diff > 1e-4:
+        raise AssertionError(f"Incremental and full-window predictions differ by {max_diff:.2e}")
+    print(f"[PASS] Incremental predictions match the full window (max diff {max_diff:.1e})")
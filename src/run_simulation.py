@@ -1,10 +1,26 @@
 # -*- coding: utf-8 -*-
 
 import os
-import csv
-import random
-import math
-import traci
+import time
+import argparse
+import subprocess
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+import numpy as np
+import traci.constants as tc
+
+from sumo_backend import traci, BACKEND_NAME
+from state_fetch import StateFetcher
+from contagion_index import ContagionIndex
+from behavior_engine import BehaviorEngine
+from vehicle_state_table import VehicleStateTable, NO_TIMER
+from vehicle_log import open_log_sink, merge_logs, LOG_DIR
+from vehicle_sharding import ShardAssigner, ViolationExchange
+from local_ports import free_port
+from sim_checkpoint import (
+    checkpoint_dir, save_checkpoint, sumo_state_file, load_behavior_state
+)
 
 # =============================
 # CONFIGURATION
@@ -15,6 +31,32 @@ ROUTE_FILE = "data/sumo_network/hinjewadi_peak.rou.xml"
 SUMO_BINARY = "sumo"
 
 SIMULATION_STEPS = 1800
+SEED = 42
+
+# "polling" (one TraCI call per variable per vehicle), "subscription" or
+# "context" (constant round-trips per step, see state_fetch.py)
+STATE_FETCH_MODE = "context"
+
+# "parquet" (columnar, needs pyarrow) or "csv"; see vehicle_log.py
+LOG_FORMAT = "parquet"
+# Serialize the log on a background thread instead of the stepping thread
+LOG_WRITER_THREAD = True
+
+# Controller processes sharing one SUMO via --num-clients (1 = single loop)
+NUM_CLIENTS = 1
+# "hash" (by vehicle ID) or "region" (network x-strip where first seen);
+# violations are broadcast to every shard, so contagion spans shards
+SHARD_MODE = "hash"
+
+# Save SUMO + behavior state every N steps (0 = off); see sim_checkpoint.py
+CHECKPOINT_EVERY = 0
+
+# Saved WorldModel to predict lane congestion in-loop (None = off); see
+# online_inference.py. "window" is exact; repeated steps over the budget
+# make it fall back to "streaming" (one carried LSTM state per lane).
+CONGESTION_MODEL = None
+PREDICTION_MODE = "window"
+PREDICTION_BUDGET_MS = 10.0
 
 # ---- Feature Toggles ----
 ENABLE_AGGRESSION = True
@@ -37,198 +79,462 @@ SURGE_DURATION = 2
 SURGE_COOLDOWN = 20
 SURGE_PRESSURE_THRESHOLD = 1.3
 
-# =============================
-# START SUMO
-# =============================
-
-sumo_cmd = [
-    SUMO_BINARY,
-    "-n", NET_FILE,
-    "-r", ROUTE_FILE,
-    "--start",
-    "--quit-on-end"
-]
-
-traci.start(sumo_cmd)
-
-os.makedirs("data/logs", exist_ok=True)
-log_file = open("data/logs/vehicle_log.csv", "w", newline="")
-writer = csv.writer(log_file)
-
-writer.writerow([
-    "time", "vehicle_id", "x", "y",
-    "speed", "waiting_time", "lane_id",
-    "violation_type"
-])
-
-# =============================
-# STATE STORAGE
-# =============================
-
-driver_traits = {}
-vehicle_capability = {}
-recent_violations = []
-wrong_way_active = {}
-surge_active = {}
-surge_cooldown = {}
-
-step = 0
-
-# =============================
-# SIMULATION LOOP
-# =============================
-
-while step < SIMULATION_STEPS:
-
-    traci.simulationStep()
-    vehicle_ids = traci.vehicle.getIDList()
-
-    # Remove expired contagion
-    recent_violations = [
-        v for v in recent_violations
-        if step - v["time"] <= CONTAGION_DURATION
+DEFAULT_CONFIG = {
+    "NET_FILE": NET_FILE,
+    "ROUTE_FILE": ROUTE_FILE,
+    "SUMO_BINARY": SUMO_BINARY,
+    "SIMULATION_STEPS": SIMULATION_STEPS,
+    "SEED": SEED,
+    "STATE_FETCH_MODE": STATE_FETCH_MODE,
+    "LOG_FORMAT": LOG_FORMAT,
+    "LOG_WRITER_THREAD": LOG_WRITER_THREAD,
+    "NUM_CLIENTS": NUM_CLIENTS,
+    "SHARD_MODE": SHARD_MODE,
+    "CHECKPOINT_EVERY": CHECKPOINT_EVERY,
+    "CONGESTION_MODEL": CONGESTION_MODEL,
+    "PREDICTION_MODE": PREDICTION_MODE,
+    "PREDICTION_BUDGET_MS": PREDICTION_BUDGET_MS,
+    "ENABLE_AGGRESSION": ENABLE_AGGRESSION,
+    "ENABLE_CONTAGION": ENABLE_CONTAGION,
+    "ENABLE_WRONG_WAY": ENABLE_WRONG_WAY,
+    "ENABLE_SPEED_SURGE": ENABLE_SPEED_SURGE,
+    "AGGRESSION_SCALE": AGGRESSION_SCALE,
+    "CONTAGION_RADIUS": CONTAGION_RADIUS,
+    "CONTAGION_DURATION": CONTAGION_DURATION,
+    "CONTAGION_MULTIPLIER": CONTAGION_MULTIPLIER,
+    "WRONG_WAY_PROB_SCALE": WRONG_WAY_PROB_SCALE,
+    "WRONG_WAY_DURATION": WRONG_WAY_DURATION,
+    "SURGE_MULTIPLIER": SURGE_MULTIPLIER,
+    "SURGE_DURATION": SURGE_DURATION,
+    "SURGE_COOLDOWN": SURGE_COOLDOWN,
+    "SURGE_PRESSURE_THRESHOLD": SURGE_PRESSURE_THRESHOLD,
+}
+
+
+def build_config(overrides=None):
+    unknown = set(overrides or {}) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise KeyError(f"Unknown simulation settings: {sorted(unknown)}")
+    return {**DEFAULT_CONFIG, **(overrides or {})}
+
+
+def sumo_command(cfg, resume_from=None):
+    cmd = [
+        cfg["SUMO_BINARY"],
+        "-n", cfg["NET_FILE"],
+        "-r", cfg["ROUTE_FILE"],
+        "--start",
+        "--quit-on-end",
+        "--seed", str(cfg["SEED"])
     ]
 
-    for vid in vehicle_ids:
-
-        if vid not in driver_traits:
-            driver_traits[vid] = random.random()
-            vehicle_capability[vid] = 1.0 if "bike" in vid else 0.6
-            surge_cooldown[vid] = 0
-
-        x, y = traci.vehicle.getPosition(vid)
-        speed = traci.vehicle.getSpeed(vid)
-        waiting = traci.vehicle.getWaitingTime(vid)
-        lane_id = traci.vehicle.getLaneID(vid)
-        desired_speed = traci.vehicle.getMaxSpeed(vid)
-
-        # =============================
-        # PRESSURE MODEL
-        # =============================
-
-        pressure = min(waiting / 60.0, 1.0)
-
-        if desired_speed > 0:
-            pressure += max(0, desired_speed - speed) / desired_speed
-
-        # Mild contagion boost
-        if ENABLE_CONTAGION:
-            for event in recent_violations:
-                dist = math.hypot(x - event["x"], y - event["y"])
-                if dist < CONTAGION_RADIUS:
-                    pressure *= CONTAGION_MULTIPLIER
-                    break
-
-        # Cap pressure to prevent runaway
-        pressure = min(pressure, 2.0)
-
-        aggressiveness = driver_traits[vid]
-        capability = vehicle_capability[vid]
-
-        violation_type = "none"
-
-        # =============================
-        # AGGRESSIVE LANE CHANGE
-        # =============================
-
-        if ENABLE_AGGRESSION:
-            violation_prob = aggressiveness * capability * pressure * AGGRESSION_SCALE
-
-            if random.random() < violation_prob:
+    if cfg["CHECKPOINT_EVERY"]:
+        cmd += ["--save-state.rng"]
+    if resume_from is not None:
+        cmd += ["--load-state", sumo_state_file(resume_from)]
+
+    return cmd
+
+
+def run(overrides=None, label="default", log_dir=LOG_DIR,
+        port=None, client_order=None, shard_index=None, resume_from=None,
+        exchange=None):
+    """
+    Run one simulation. `overrides` replaces any DEFAULT_CONFIG entries;
+    `label` names the TraCI connection so several runs can coexist.
+    Returns a summary dict of the run.
+
+    With `port` set, attach as client `client_order` to a SUMO already
+    started by run_multiclient() and only control the vehicles of shard
+    `shard_index`; `exchange` (a ViolationExchange) shares contagion
+    events with the other shards.
+
+    With `resume_from` set to a checkpoint directory, SUMO and the
+    behavior state are restored from it and the run continues from the
+    saved step; `overrides` may differ from the run that saved it.
+    """
+    cfg = build_config(overrides)
+    started = time.perf_counter()
+
+    # =============================
+    # START SUMO
+    # =============================
+
+    if port is None:
+        traci.start(sumo_command(cfg, resume_from), label=label)
+    else:
+        traci.init(port, label=label, numRetries=60)
+        traci.setOrder(client_order)
+
+    fetcher = StateFetcher(cfg["STATE_FETCH_MODE"])
+    fetcher.setup()
+
+    assigner = None
+    if shard_index is not None:
+        (xmin, _), (xmax, _) = traci.simulation.getNetBoundary()
+        assigner = ShardAssigner(
+            shard_index, cfg["NUM_CLIENTS"], cfg["SHARD_MODE"], (xmin, xmax)
+        )
+
+    log_sink = open_log_sink(
+        cfg["LOG_FORMAT"], threaded=cfg["LOG_WRITER_THREAD"], log_dir=log_dir
+    )
+
+    # =============================
+    # STATE STORAGE
+    # =============================
+
+    vehicle_table = VehicleStateTable()
+    recent_violations = ContagionIndex(cfg["CONTAGION_RADIUS"], cfg["CONTAGION_DURATION"])
+
+    engine = BehaviorEngine(
+        cfg["SEED"] if shard_index is None else [cfg["SEED"], shard_index],
+        enable_aggression=cfg["ENABLE_AGGRESSION"],
+        enable_contagion=cfg["ENABLE_CONTAGION"],
+        enable_wrong_way=cfg["ENABLE_WRONG_WAY"],
+        enable_speed_surge=cfg["ENABLE_SPEED_SURGE"],
+        aggression_scale=cfg["AGGRESSION_SCALE"],
+        contagion_multiplier=cfg["CONTAGION_MULTIPLIER"],
+        wrong_way_prob_scale=cfg["WRONG_WAY_PROB_SCALE"],
+        surge_pressure_threshold=cfg["SURGE_PRESSURE_THRESHOLD"]
+    )
+
+    # Needs the whole network's vehicles, so not in shard workers
+    predictor = None
+    congestion_probs = None
+    if cfg["CONGESTION_MODEL"] and shard_index is None:
+        from online_inference import CongestionPredictor
+        predictor = CongestionPredictor(
+            cfg["CONGESTION_MODEL"], latency_budget_ms=cfg["PREDICTION_BUDGET_MS"],
+            mode=cfg["PREDICTION_MODE"]
+        )
+
+    step = 0
+    violation_counts = {}
+
+    if resume_from is not None:
+        saved = load_behavior_state(resume_from)
+        step = saved["step"]
+        vehicle_table = saved["vehicle_table"]
+        violation_counts = saved["violation_counts"]
+
+        # Re-index so contagion settings may differ from the saved run
+        for event_step, x, y in saved["recent_violations"]:
+            recent_violations.add(event_step, x, y)
+
+        # Branches with a new seed draw fresh behavior from here on
+        if saved["seed"] == cfg["SEED"]:
+            engine.rng.bit_generator.state = saved["rng_state"]
+
+        print(f"Resumed from {resume_from} at step {step}")
+
+    # =============================
+    # SIMULATION LOOP
+    # =============================
+
+    # Always flush the log and release SUMO, even if a step raises
+    try:
+        while step < cfg["SIMULATION_STEPS"]:
+
+            traci.simulationStep()
+            vehicle_states = fetcher.fetch()
+
+            # Other shards' violations of the previous step
+            if exchange is not None:
+                for event in exchange.receive(step):
+                    recent_violations.add(*event)
+
+            # Recycle the state slots of vehicles that left the network
+            arrived = traci.simulation.getArrivedIDList()
+            vehicle_table.release(arrived)
+
+            if assigner is not None:
+                assigner.release(arrived)
+                owned = assigner.owned_mask(
+                    list(vehicle_states),
+                    [s[tc.VAR_POSITION][0] for s in vehicle_states.values()]
+                )
+                vehicle_states = {
+                    vid: state
+                    for (vid, state), own in zip(vehicle_states.items(), owned)
+                    if own
+                }
+
+            # Remove expired contagion
+            recent_violations.advance(step)
+
+            vids = list(vehicle_states)
+            states = list(vehicle_states.values())
+            n = len(vids)
+
+            slots, new_slots = vehicle_table.intern(vids)
+            if len(new_slots):
+                vehicle_table.aggressiveness[new_slots] = engine.draw_traits(len(new_slots))
+                vehicle_table.capability[new_slots] = [
+                    1.0 if "bike" in vehicle_table.vehicle_of[slot] else 0.6
+                    for slot in new_slots
+                ]
+
+            # =============================
+            # STEP STATE ARRAYS
+            # =============================
+
+            xs = np.fromiter((s[tc.VAR_POSITION][0] for s in states), float, n)
+            ys = np.fromiter((s[tc.VAR_POSITION][1] for s in states), float, n)
+            speed = np.fromiter((s[tc.VAR_SPEED] for s in states), float, n)
+            waiting = np.fromiter((s[tc.VAR_WAITING_TIME] for s in states), float, n)
+            max_speed = np.fromiter((s[tc.VAR_MAXSPEED] for s in states), float, n)
+            lane_index = np.fromiter((s[tc.VAR_LANE_INDEX] for s in states), np.int64, n)
+            num_lanes = np.fromiter(
+                (fetcher.lane_count(s[tc.VAR_ROAD_ID]) for s in states), np.int64, n
+            )
+
+            aggressiveness = vehicle_table.aggressiveness[slots]
+            capability = vehicle_table.capability[slots]
+            cooldown = vehicle_table.surge_cooldown[slots]
+
+            # Violations from this step only influence neighbours from the next step
+            near_violation = (
+                recent_violations.near_mask(xs, ys) if cfg["ENABLE_CONTAGION"]
+                else np.zeros(n, dtype=bool)
+            )
+
+            decisions = engine.decide(
+                step, speed, waiting, max_speed, aggressiveness, capability,
+                cooldown, lane_index, num_lanes, near_violation
+            )
+
+            violation_type = np.full(n, "none", dtype=object)
+            step_events = []  # (step, x, y) contagion sources of this step
+
+            # =============================
+            # AGGRESSIVE LANE CHANGE
+            # =============================
+
+            for i, target in zip(decisions.lane_change, decisions.lane_change_target):
                 try:
-                    current_lane = traci.vehicle.getLaneIndex(vid)
-                    edge_id = traci.vehicle.getRoadID(vid)
-                    num_lanes = traci.edge.getLaneNumber(edge_id)
-
-                    if num_lanes > 1:
-                        if current_lane + 1 < num_lanes:
-                            traci.vehicle.changeLane(vid, current_lane + 1, 3)
-                        elif current_lane - 1 >= 0:
-                            traci.vehicle.changeLane(vid, current_lane - 1, 3)
-
-                        violation_type = "aggressive_lane_change"
-
-                        recent_violations.append({
-                            "time": step,
-                            "x": x,
-                            "y": y
-                        })
-
-                except:
+                    traci.vehicle.changeLane(vids[i], int(target), 3)
+                    violation_type[i] = "aggressive_lane_change"
+                    step_events.append((step, xs[i], ys[i]))
+                except traci.TraCIException:
                     pass
 
-        # =============================
-        # WRONG WAY (Rare, Multi-lane only)
-        # =============================
-
-        if ENABLE_WRONG_WAY:
-            edge_id = traci.vehicle.getRoadID(vid)
-            num_lanes = traci.edge.getLaneNumber(edge_id)
+            # =============================
+            # WRONG WAY (Rare, Multi-lane only)
+            # =============================
 
-            if num_lanes > 1 and random.random() < aggressiveness * WRONG_WAY_PROB_SCALE:
+            for i in decisions.wrong_way:
+                vid = vids[i]
                 try:
                     route = traci.vehicle.getRoute(vid)
 
                     if len(route) > 1:
                         reversed_edge = "-" + route[0] if not route[0].startswith("-") else route[0][1:]
-                        traci.vehicle.setRoute(vid, [reversed_edge] + route[1:])
-                        wrong_way_active[vid] = step + WRONG_WAY_DURATION
-                        violation_type = "wrong_way_short"
+                        traci.vehicle.setRoute(vid, [reversed_edge] + list(route[1:]))
+                        vehicle_table.wrong_way_until[slots[i]] = step + cfg["WRONG_WAY_DURATION"]
+                        violation_type[i] = "wrong_way_short"
+                        step_events.append((step, xs[i], ys[i]))
+                except traci.TraCIException:
+                    pass
 
-                        recent_violations.append({
-                            "time": step,
-                            "x": x,
-                            "y": y
-                        })
+            for event in step_events:
+                recent_violations.add(*event)
+            if exchange is not None:
+                exchange.publish([(t, float(x), float(y)) for t, x, y in step_events])
 
-                except:
+            wrong_way_until = vehicle_table.wrong_way_until[slots]
+            for i in np.flatnonzero((wrong_way_until != NO_TIMER) & (step > wrong_way_until)):
+                try:
+                    original_route = traci.vehicle.getRoute(vids[i])
+                    traci.vehicle.setRoute(vids[i], original_route)
+                except traci.TraCIException:
                     pass
+                vehicle_table.wrong_way_until[slots[i]] = NO_TIMER
+
+            # =============================
+            # SHORT SPEED SURGE (With cooldown)
+            # =============================
 
-        if vid in wrong_way_active and step > wrong_way_active[vid]:
-            try:
-                original_route = traci.vehicle.getRoute(vid)
-                traci.vehicle.setRoute(vid, original_route)
-            except:
-                pass
-            del wrong_way_active[vid]
-
-        # =============================
-        # SHORT SPEED SURGE (With cooldown)
-        # =============================
-
-        if ENABLE_SPEED_SURGE:
-
-            if step >= surge_cooldown[vid] and pressure > SURGE_PRESSURE_THRESHOLD:
-                if random.random() < aggressiveness * 0.1:
-
-                    try:
-                        traci.vehicle.setSpeed(vid, speed * SURGE_MULTIPLIER)
-                        surge_active[vid] = step + SURGE_DURATION
-                        surge_cooldown[vid] = step + SURGE_COOLDOWN
-                        violation_type = "speed_surge"
-                    except:
-                        pass
-
-        if vid in surge_active and step > surge_active[vid]:
-            try:
-                traci.vehicle.setSpeed(vid, -1)
-            except:
-                pass
-            del surge_active[vid]
-
-        # =============================
-        # LOGGING
-        # =============================
-
-        writer.writerow([
-            step, vid, x, y,
-            speed, waiting, lane_id,
-            violation_type
-        ])
-
-    step += 1
-
-log_file.close()
-traci.close()
-
-print("[PASS] Conservative realism simulation completed.")
\ No newline at end of file
+            for i in decisions.surge:
+                try:
+                    traci.vehicle.setSpeed(vids[i], speed[i] * cfg["SURGE_MULTIPLIER"])
+                    vehicle_table.surge_until[slots[i]] = step + cfg["SURGE_DURATION"]
+                    vehicle_table.surge_cooldown[slots[i]] = step + cfg["SURGE_COOLDOWN"]
+                    violation_type[i] = "speed_surge"
+                except traci.TraCIException:
+                    pass
+
+            surge_until = vehicle_table.surge_until[slots]
+            for i in np.flatnonzero((surge_until != NO_TIMER) & (step > surge_until)):
+                try:
+                    traci.vehicle.setSpeed(vids[i], -1)
+                except traci.TraCIException:
+                    pass
+                vehicle_table.surge_until[slots[i]] = NO_TIMER
+
+            # =============================
+            # LOGGING
+            # =============================
+
+            for v in violation_type[violation_type != "none"]:
+                violation_counts[v] = violation_counts.get(v, 0) + 1
+
+            lane_ids = [s[tc.VAR_LANE_ID] for s in states]
+
+            log_sink.write_step(
+                step, vids, xs, ys, speed, waiting, lane_ids, violation_type
+            )
+
+            # =============================
+            # CONGESTION PREDICTION
+            # =============================
+
+            if predictor is not None:
+                probs = predictor.observe(lane_ids, speed, violation_type != "none")
+                if probs is not None:
+                    congestion_probs = probs
+
+            step += 1
+
+            if (cfg["CHECKPOINT_EVERY"] and shard_index is None
+                    and step % cfg["CHECKPOINT_EVERY"] == 0):
+                save_checkpoint(traci, checkpoint_dir(label, step), {
+                    "step": step,
+                    "seed": cfg["SEED"],
+                    "rng_state": engine.rng.bit_generator.state,
+                    "vehicle_table": vehicle_table,
+                    "recent_violations": recent_violations.events(),
+                    "violation_counts": violation_counts,
+                })
+
+    finally:
+        try:
+            log_sink.close()
+        finally:
+            traci.close()
+
+    summary = {
+        "label": label,
+        "steps": step,
+        "violations": violation_counts,
+        "wall_time": time.perf_counter() - started,
+    }
+
+    if predictor is not None:
+        summary["prediction_latency"] = predictor.latency_report()
+        summary["congestion_probs"] = congestion_probs
+
+    return summary
+
+
+def _coordinate(port, steps):
+    """Coordinator client of a multi-client run: only steps the simulation."""
+    traci.init(port, label="coordinator", numRetries=60)
+    traci.setOrder(1)
+
+    try:
+        for _ in range(steps):
+            traci.simulationStep()
+    finally:
+        traci.close()
+
+
+def run_multiclient(overrides=None, log_dir=LOG_DIR):
+    """
+    One SUMO, NUM_CLIENTS controller processes. Each worker attaches with
+    its own client order, runs the behavior loop for its shard of vehicles
+    and writes its own log; this process only steps the simulation, hosts
+    the queues that relay violation events between the shards, and merges
+    the shard logs once every worker is done.
+    """
+    if BACKEND_NAME == "libsumo":
+        raise RuntimeError("Multi-client mode needs the traci backend (SUMO_BACKEND=traci)")
+
+    cfg = build_config(overrides)
+    num_clients = cfg["NUM_CLIENTS"]
+    started = time.perf_counter()
+    port = free_port()
+
+    shard_dirs = [os.path.join(log_dir, f"shard_{k}") for k in range(num_clients)]
+
+    sumo = subprocess.Popen(
+        sumo_command(cfg) + ["--num-clients", str(num_clients + 1), "--remote-port", str(port)]
+    )
+
+    with Manager() as manager, ProcessPoolExecutor(max_workers=num_clients) as pool, \
+            ThreadPoolExecutor(max_workers=1) as coordinator_pool:
+        inboxes = [manager.Queue() for _ in range(num_clients)]
+
+        # Workers retry until SUMO listens; SUMO waits for all clients
+        futures = [
+            pool.submit(run, overrides, f"shard_{k}", shard_dirs[k],
+                        port, k + 2, k, exchange=ViolationExchange(k, inboxes))
+            for k in range(num_clients)
+        ]
+        coordinator = coordinator_pool.submit(_coordinate, port, cfg["SIMULATION_STEPS"])
+
+        # SUMO, and the coordinator with it, would wait forever on a client
+        # that failed: kill it, which unblocks every attached client, and
+        # re-raise the first failure
+        done, _ = wait(futures + [coordinator], return_when=FIRST_EXCEPTION)
+        failed = [f for f in futures + [coordinator] if f in done and f.exception() is not None]
+
+        if failed:
+            for f in futures:
+                f.cancel()
+            sumo.kill()
+            sumo.wait()
+            raise failed[0].exception()
+
+        summaries = [f.result() for f in futures]
+
+    sumo.wait()
+
+    log_name = "vehicle_log.parquet" if cfg["LOG_FORMAT"] == "parquet" else "vehicle_log.csv"
+    merge_logs(
+        [os.path.join(d, log_name) for d in shard_dirs],
+        os.path.join(log_dir, log_name)
+    )
+
+    violation_counts = {}
+    for summary in summaries:
+        for v, count in summary["violations"].items():
+            violation_counts[v] = violation_counts.get(v, 0) + count
+
+    return {
+        "label": "coordinator",
+        "steps": cfg["SIMULATION_STEPS"],
+        "violations": violation_counts,
+        "wall_time": time.perf_counter() - started,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-clients", type=int, default=NUM_CLIENTS,
+                        help="controller processes sharing one SUMO instance")
+    parser.add_argument("--shard-mode", choices=["hash", "region"], default=SHARD_MODE)
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+                        help="save a checkpoint every N steps (0 = off)")
+    parser.add_argument("--resume-from", default=None,
+                        help="checkpoint directory to warm-start from")
+    parser.add_argument("--congestion-model", default=CONGESTION_MODEL,
+                        help="saved WorldModel to run in-loop (e.g. data/models/world_model.pt)")
+    args = parser.parse_args()
+
+    overrides = {"CHECKPOINT_EVERY": args.checkpoint_every,
+                 "CONGESTION_MODEL": args.congestion_model}
+
+    if args.num_clients > 1:
+        if args.resume_from:
+            parser.error("--resume-from is not supported with --num-clients")
+        run_multiclient({**overrides, "NUM_CLIENTS": args.num_clients,
+                         "SHARD_MODE": args.shard_mode})
+    else:
+        summary = run(overrides, resume_from=args.resume_from)
+
+        if "prediction_latency" in summary:
+            from online_inference import print_latency_report
+            print_latency_report(summary["prediction_latency"])
+
+    print("[PASS] Conservative realism simulation completed.")
\ No newline at end of file
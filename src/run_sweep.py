@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parallel parameter sweep over run_simulation.py.
+
+Every combination of PARAM_GRID x SEEDS becomes one run with its own
+SUMO instance (TraCI label = run ID, free port picked by traci.start),
+seed and log directory. Runs are spread over a process pool, and the
+logs form one Hive-partitioned dataset:
+
+    data/sweeps/<SWEEP_NAME>/logs/run_id=<run_id>/vehicle_log.parquet
+    data/sweeps/<SWEEP_NAME>/sweep_index.csv   (run_id -> parameters)
+
+Load everything back with load_sweep_logs(), which adds a run_id column.
+"""
+
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import run_simulation
+from vehicle_log import load_vehicle_log, part_files, LOG_COLUMNS
+
+SWEEP_NAME = "ablation"
+SWEEP_ROOT = "data/sweeps"
+
+# Any DEFAULT_CONFIG key of run_simulation.py can be swept
+PARAM_GRID = {
+    "AGGRESSION_SCALE": [0.1, 0.2, 0.3],
+    "CONTAGION_RADIUS": [10.0, 15.0, 25.0],
+    "ENABLE_WRONG_WAY": [True, False],
+}
+SEEDS = [42, 43]
+
+# Checkpoint directory to branch every run from (None = simulate from t=0)
+RESUME_FROM = None
+
+MAX_WORKERS = os.cpu_count()
+
+
+def expand_grid(param_grid, seeds):
+    names = sorted(param_grid)
+    runs = []
+
+    for values in itertools.product(*(param_grid[n] for n in names)):
+        for seed in seeds:
+            overrides = dict(zip(names, values))
+            overrides["SEED"] = seed
+            runs.append((f"run_{len(runs):03d}", overrides))
+
+    return runs
+
+
+def run_one(run_id, overrides, sweep_dir, resume_from=RESUME_FROM):
+    log_dir = os.path.join(sweep_dir, "logs", f"run_id={run_id}")
+    os.makedirs(log_dir, exist_ok=True)
+
+    summary = run_simulation.run(overrides, label=run_id, log_dir=log_dir,
+                                 resume_from=resume_from)
+    return {"log_dir": log_dir, **summary}
+
+
+def run_sweep(param_grid=PARAM_GRID, seeds=SEEDS, sweep_name=SWEEP_NAME,
+              max_workers=MAX_WORKERS):
+    sweep_dir = os.path.join(SWEEP_ROOT, sweep_name)
+    os.makedirs(sweep_dir, exist_ok=True)
+
+    runs = expand_grid(param_grid, seeds)
+    print(f"Sweep '{sweep_name}': {len(runs)} runs on {max_workers} workers")
+
+    rows = []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(run_one, run_id, overrides, sweep_dir): (run_id, overrides)
+            for run_id, overrides in runs
+        }
+
+        for future in as_completed(futures):
+            run_id, overrides = futures[future]
+            row = {"run_id": run_id, **overrides}
+
+            try:
+                summary = future.result()
+                row.update({
+                    "status": "ok",
+                    "steps": summary["steps"],
+                    "wall_time": round(summary["wall_time"], 2),
+                    "log_dir": summary["log_dir"],
+                })
+                for violation, count in summary["violations"].items():
+                    row[f"n_{violation}"] = count
+                print(f"[PASS] {run_id} ({summary['wall_time']:.1f}s)")
+
+            except Exception as e:
+                row.update({"status": "failed", "error": repr(e)})
+                print(f"[FAIL] {run_id}")
+                print(f"       -> {e}")
+
+            rows.append(row)
+
+    index = pd.DataFrame(rows).sort_values("run_id")
+    index_file = os.path.join(sweep_dir, "sweep_index.csv")
+    index.to_csv(index_file, index=False)
+
+    print(f"\nSaved sweep index to {index_file}")
+    return index
+
+
+def load_sweep_logs(sweep_name=SWEEP_NAME, columns=None):
+    """
+    All logs of a sweep as one DataFrame with a run_id column.
+    Join with sweep_index.csv on run_id for the parameters.
+
+    Each run is read with load_vehicle_log(), so a run that crashed
+    contributes the part files it flushed; runs without any log (failed
+    before the first flush) are skipped and reported.
+    """
+    logs_dir = os.path.join(SWEEP_ROOT, sweep_name, "logs")
+    log_columns = None if columns is None else [c for c in columns if c != "run_id"]
+
+    frames = []
+    skipped = []
+
+    for d in sorted(os.listdir(logs_dir)):
+        run_id = d.split("=", 1)[1]
+        parquet_file = os.path.join(logs_dir, d, "vehicle_log.parquet")
+        csv_file = os.path.join(logs_dir, d, "vehicle_log.csv")
+
+        if os.path.exists(parquet_file) or part_files(parquet_file):
+            frame = load_vehicle_log(parquet_file, columns=log_columns)
+        elif os.path.exists(csv_file):
+            frame = load_vehicle_log(csv_file, columns=log_columns)
+        else:
+            skipped.append(run_id)
+            continue
+
+        frame["run_id"] = run_id
+        frames.append(frame)
+
+    if skipped:
+        print(f"[WARN] {len(skipped)} runs have no vehicle log, skipped: {', '.join(skipped)}")
+
+    if not frames:
+        return pd.DataFrame(columns=(log_columns or LOG_COLUMNS) + ["run_id"])
+
+    logs = pd.concat(frames, ignore_index=True)
+
+    # Categories differ per run; re-encode over the whole sweep
+    for column in ["vehicle_id", "lane_id", "violation_type", "run_id"]:
+        if column in logs and not isinstance(logs[column].dtype, pd.CategoricalDtype):
+            logs[column] = logs[column].astype("category")
+
+    return logs
+
+
+if __name__ == "__main__":
+    run_sweep()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming per-feature mean / standard deviation (Welford, merged chunk by
+chunk with Chan et al.'s parallel update), so normalization statistics can
+be computed over arrays larger than RAM, e.g. a memory-mapped [T, N, F]
+world-state tensor.
+"""
+
+import numpy as np
+
+# Timesteps per chunk when scanning a [T, N, F] array
+STATS_CHUNK_STEPS = 256
+
+
+class RunningStats:
+
+    def __init__(self, num_features):
+        self.count = 0
+        self.mean = np.zeros(num_features)
+        self.m2 = np.zeros(num_features)
+
+    def update(self, values):
+        """Add a batch of samples, shaped [..., num_features]."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.mean.size)
+        n = len(values)
+        if n == 0:
+            return
+
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self):
+        """Population standard deviation (ddof=0, as numpy's std)."""
+        return np.sqrt(self.m2 / max(self.count, 1))
+
+
+def feature_stats(features, end=None, chunk_steps=STATS_CHUNK_STEPS):
+    """
+    (mean, std) per feature over features[:end] of a [T, N, F] array,
+    reading `chunk_steps` timesteps at a time.
+    """
+    end = features.shape[0] if end is None else min(end, features.shape[0])
+    stats = RunningStats(features.shape[-1])
+
+    for start in range(0, end, chunk_steps):
+        stats.update(features[start:min(start + chunk_steps, end)])
+
+    return stats.mean, stats.std
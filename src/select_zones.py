@@ -1,41 +1,264 @@
 # -*- coding: utf-8 -*-
 
+"""
+Origin / destination zones chosen from the structure of the compiled network
+(see compiled_network.py), written to a zone file for generate_flows.py.
 
-import sumolib
+Everything runs on the edge graph (edge -> successor edge) restricted to
+normal edges open to ZONE_VCLASS:
+
+    betweenness  approximate edge betweenness (Brandes, unweighted), from
+                 BETWEENNESS_SAMPLES sampled source edges, scaled by
+                 n / samples; the sources are split across WORKERS processes
+    core         the strongly connected component around the most central
+                 edge: forward reach ∩ backward reach of that edge
+    entry        edges with no predecessor, or starting at a dead-end
+                 junction, that can reach the core
+    exit         edges with no successor, or ending at a dead-end junction,
+                 reachable from the core
+    core zones   the CORE_ZONES most central edges of the core
+
+So every entry -> core zone -> exit trip in the file is routable, which is
+how generate_flows.py uses them (from entry, via core zone, to exit). BFS and
+Brandes are level-synchronous over the CSR arrays (one numpy pass per BFS
+level), which keeps 10^5-edge networks in the seconds range.
+"""
+
+import os
+import json
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from compiled_network import load_compiled_network, csr, net_file_hash
 
 NET_FILE = "data/sumo_network/hinjewadi_phase3.net.xml"
-net = sumolib.net.readNet(NET_FILE)
+ZONE_FILE = "data/sumo_network/zones.json"
+
+ZONE_VCLASS = "passenger"
+CORE_ZONES = 20
+BETWEENNESS_SAMPLES = 256
+WORKERS = os.cpu_count() or 1
+SEED = 42
+
+
+# ==========================================================
+# GRAPH
+# ==========================================================
+
+def neighbours(indptr, indices, nodes):
+    """(source, target) arrays of all CSR arcs leaving `nodes`."""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    offsets = np.cumsum(counts) - counts
+
+    arcs = np.arange(counts.sum()) - np.repeat(offsets - starts, counts)
+    return np.repeat(nodes, counts), indices[arcs]
+
+
+def first_occurrences(values, slots):
+    """`values` without repeats, in O(len(values)) using a scratch `slots` array."""
+    order = np.arange(len(values))
+    slots[values] = order
+    return values[slots[values] == order]
+
+
+def subgraph(net, keep):
+    """(out_indptr, out_indices, in_indptr, in_indices) of the edges in `keep`."""
+    src = np.repeat(np.arange(net.num_edges), net.out_degree())
+    dst = np.asarray(net.out_indices)
+    arc = keep[src] & keep[dst]
+
+    out_indptr, out_indices = csr(np.where(arc, src, -1), dst, net.num_edges)
+    in_indptr, in_indices = csr(np.where(arc, dst, -1), src, net.num_edges)
+    return out_indptr, out_indices, in_indptr, in_indices
+
+
+def reach(indptr, indices, sources, num_nodes):
+    """Boolean mask of nodes reachable from any of `sources` (sources included)."""
+    seen = np.zeros(num_nodes, dtype=bool)
+    slots = np.zeros(num_nodes, dtype=np.int64)
+    frontier = np.unique(np.asarray(sources, dtype=np.int64))
+    seen[frontier] = True
+
+    while frontier.size:
+        _, nxt = neighbours(indptr, indices, frontier)
+        frontier = first_occurrences(nxt[~seen[nxt]], slots)
+        seen[frontier] = True
+
+    return seen
+
+
+# ==========================================================
+# APPROXIMATE BETWEENNESS
+# ==========================================================
+
+_graph = None
+
+
+def _init_worker(indptr, indices):
+    global _graph
+    _graph = (indptr, indices)
+
+
+def _source_dependencies(sources):
+    """Summed Brandes dependencies of `sources` (unweighted shortest paths)."""
+    indptr, indices = _graph
+    num_nodes = len(indptr) - 1
+    total = np.zeros(num_nodes)
+
+    dist = np.full(num_nodes, -1, dtype=np.int64)
+    sigma = np.zeros(num_nodes)
+    delta = np.zeros(num_nodes)
+    slots = np.zeros(num_nodes, dtype=np.int64)
+
+    for s in sources:
+        dist[s] = 0
+        sigma[s] = 1.0
+        frontier = np.array([s], dtype=np.int64)
+        visited = [frontier]
+        levels = []   # shortest-path arcs (u, v) between consecutive levels
+        depth = 0
+
+        # Forward: BFS levels and shortest-path counts
+        while frontier.size:
+            u, v = neighbours(indptr, indices, frontier)
+            fresh = first_occurrences(v[dist[v] < 0], slots)
+            dist[fresh] = depth + 1
+
+            on_path = dist[v] == depth + 1
+            u, v = u[on_path], v[on_path]
+            np.add.at(sigma, v, sigma[u])
+
+            levels.append((u, v))
+            visited.append(fresh)
+            frontier = fresh
+            depth += 1
+
+        # Backward: accumulate dependencies level by level
+        for u, v in reversed(levels):
+            np.add.at(delta, u, sigma[u] / sigma[v] * (1.0 + delta[v]))
+
+        delta[s] = 0.0
+        total += delta
+
+        # Reset only what this source touched
+        touched = np.concatenate(visited)
+        dist[touched] = -1
+        sigma[touched] = 0.0
+        delta[touched] = 0.0
+
+    return total
+
+
+def approximate_betweenness(indptr, indices, nodes, samples=BETWEENNESS_SAMPLES,
+                            workers=WORKERS, seed=SEED):
+    """
+    Betweenness of every node estimated from `samples` source nodes drawn
+    from `nodes`, scaled to the full source count.
+    """
+    rng = np.random.default_rng(seed)
+    nodes = np.asarray(nodes, dtype=np.int64)
+    sources = rng.choice(nodes, size=min(samples, len(nodes)), replace=False)
+
+    if workers <= 1 or len(sources) < 2:
+        _init_worker(indptr, indices)
+        total = _source_dependencies(sources)
+    else:
+        chunks = np.array_split(sources, min(len(sources), workers * 4))
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(indptr, indices)) as pool:
+            total = sum(pool.map(_source_dependencies, chunks))
+
+    return total * (len(nodes) / max(len(sources), 1))
+
+
+# ==========================================================
+# ZONES
+# ==========================================================
+
+def select_zones(net, vclass=ZONE_VCLASS, core_zones=CORE_ZONES,
+                 samples=BETWEENNESS_SAMPLES, workers=WORKERS, seed=SEED):
+    # Normal edges with at least one lane open to the vehicle class
+    usable = ~net.special_edges() & (np.diff(net.edge_lane_indptr) > 0)
+    valid = usable & net.edges_allowing(vclass)
+    nodes = np.flatnonzero(valid)
+
+    if nodes.size == 0:
+        raise ValueError(f"No edges open to '{vclass}' in the network")
+
+    out_indptr, out_indices, in_indptr, in_indices = subgraph(net, valid)
+    n = net.num_edges
+
+    betweenness = approximate_betweenness(out_indptr, out_indices, nodes,
+                                          samples, workers, seed)
+    betweenness[~valid] = -np.inf
+
+    # Core: the strongly connected component of the most central edge
+    pivot = int(np.argmax(betweenness))
+    downstream = reach(out_indptr, out_indices, [pivot], n)
+    upstream = reach(in_indptr, in_indices, [pivot], n)
+    core = downstream & upstream
+
+    # Fringe edges: no predecessor / successor, or a dead-end junction
+    # (trailing False: junction code -1 = no junction)
+    dead_end = np.append(np.asarray(net.junction_type) == "dead_end", False)
+    starts_at_fringe = dead_end[net.edge_from]
+    ends_at_fringe = dead_end[net.edge_to]
+
+    entry = valid & ((np.diff(in_indptr) == 0) | starts_at_fringe) & upstream
+    exit_ = valid & ((np.diff(out_indptr) == 0) | ends_at_fringe) & downstream
+
+    core_nodes = np.flatnonzero(core)
+    ranked = core_nodes[np.argsort(-betweenness[core_nodes], kind="stable")][:core_zones]
+
+    return {
+        "entry": net.edge_ids[entry].tolist(),
+        "exit": net.edge_ids[exit_].tolist(),
+        "core": [
+            {"edge": str(net.edge_ids[e]), "betweenness": float(betweenness[e])}
+            for e in ranked
+        ],
+        "stats": {
+            "valid_edges": int(valid.sum()),
+            "core_component_edges": int(core.sum()),
+            "betweenness_samples": int(min(samples, len(nodes))),
+        },
+    }
+
 
-valid_entry_edges = []
-valid_core_edges = []
+def write_zone_file(zones, path, net_file, vclass=ZONE_VCLASS):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "net_file": net_file,
+            "net_hash": net_file_hash(net_file),
+            "vclass": vclass,
+            **zones,
+        }, f, indent=2)
 
-for edge in net.getEdges():
 
-    if edge.isSpecial():
-        continue
+def load_zone_file(path=ZONE_FILE):
+    with open(path) as f:
+        return json.load(f)
 
-    lanes = edge.getLanes()
-    if len(lanes) == 0:
-        continue
 
-    # Check if ANY lane allows passenger vehicles
-    allows_passenger = False
-    for lane in lanes:
-        perms = lane.getPermissions()
-        if perms is None or "passenger" in perms:
-            allows_passenger = True
-            break
+if __name__ == "__main__":
+    start = time.perf_counter()
+    net = load_compiled_network(NET_FILE)
+    zones = select_zones(net)
+    write_zone_file(zones, ZONE_FILE, NET_FILE)
+    elapsed = time.perf_counter() - start
 
-    if not allows_passenger:
-        continue
+    print(f"Valid edges: {zones['stats']['valid_edges']} "
+          f"(core component: {zones['stats']['core_component_edges']})")
+    print(f"Entry zones: {len(zones['entry'])}, exit zones: {len(zones['exit'])}, "
+          f"core zones: {len(zones['core'])}")
 
-    # Entry edges: no incoming connections
-    if len(edge.getIncoming()) == 0:
-        valid_entry_edges.append(edge)
+    for zone in zones["core"][:5]:
+        print(f"  {zone['edge']:<30} betweenness {zone['betweenness']:.1f}")
 
-    # Core edges: high connectivity
-    if len(edge.getIncoming()) > 2 and len(edge.getOutgoing()) > 2:
-        valid_core_edges.append(edge)
+    if not zones["entry"] or not zones["exit"]:
+        print("[WARN] No entry or exit zones reach the core component")
 
-print("Valid Entry Edge:", valid_entry_edges[0].getID())
-print("Valid Core Edge:", valid_core_edges[0].getID())
\ No newline at end of file
+    print(f"[PASS] Zone file saved to {ZONE_FILE} ({elapsed:.1f}s)")
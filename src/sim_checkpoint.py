@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""
+Simulation checkpoints for warm-started runs.
+
+A checkpoint is a directory holding SUMO's own state
+(``traci.simulation.saveState``, including RNG states) next to a pickle
+of the Python-side behavior state: the vehicle state table (traits,
+cooldowns, surge and wrong-way timers), the contagion index of recent
+violations, the behavior engine's RNG state and the step counter.
+
+    data/checkpoints/<label>/step_000600/sumo_state.xml.gz
+    data/checkpoints/<label>/step_000600/behavior_state.pkl
+"""
+
+import os
+import pickle
+
+CHECKPOINT_ROOT = "data/checkpoints"
+
+SUMO_STATE_FILE = "sumo_state.xml.gz"
+BEHAVIOR_STATE_FILE = "behavior_state.pkl"
+
+
+def checkpoint_dir(label, step, root=CHECKPOINT_ROOT):
+    return os.path.join(root, label, f"step_{step:06d}")
+
+
+def save_checkpoint(traci, path, behavior_state):
+    os.makedirs(path, exist_ok=True)
+
+    traci.simulation.saveState(os.path.join(path, SUMO_STATE_FILE))
+
+    # Write then rename so an interrupted save never leaves a torn pickle
+    tmp_file = os.path.join(path, BEHAVIOR_STATE_FILE + ".tmp")
+    with open(tmp_file, "wb") as f:
+        pickle.dump(behavior_state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, os.path.join(path, BEHAVIOR_STATE_FILE))
+
+
+def sumo_state_file(path):
+    state_file = os.path.join(path, SUMO_STATE_FILE)
+    if not os.path.exists(state_file):
+        raise FileNotFoundError(f"No SUMO state in checkpoint {path}")
+    return state_file
+
+
+def load_behavior_state(path):
+    with open(os.path.join(path, BEHAVIOR_STATE_FILE), "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-step vehicle state fetching for the simulation loop.
+
+Three modes are supported:
+
+* ``polling``      - one TraCI getter per variable per vehicle (original path)
+* ``subscription`` - ``traci.vehicle.subscribe`` once per departed vehicle,
+                     values read back from ``getAllSubscriptionResults``
+* ``context``      - a single junction context subscription whose radius
+                     covers the whole network, so every vehicle's variables
+                     arrive with the ``simulationStep`` response
+
+In ``context`` mode a step costs a constant number of round-trips
+(``simulationStep`` + ``getIDList``) regardless of the vehicle count.
+``subscription`` mode adds one ``vehicle.subscribe`` per vehicle departed
+in that step, so its cost follows the departure rate instead of the
+number of vehicles in the network.
+"""
+
+import math
+import traci.constants as tc
+
+from sumo_backend import traci
+
+FETCH_MODES = ("polling", "subscription", "context")
+
+VEHICLE_VARS = [
+    tc.VAR_POSITION,
+    tc.VAR_SPEED,
+    tc.VAR_WAITING_TIME,
+    tc.VAR_LANE_ID,
+    tc.VAR_MAXSPEED,
+    tc.VAR_ROAD_ID,
+    tc.VAR_LANE_INDEX,
+]
+
+_POLLING_GETTERS = {
+    tc.VAR_POSITION: traci.vehicle.getPosition,
+    tc.VAR_SPEED: traci.vehicle.getSpeed,
+    tc.VAR_WAITING_TIME: traci.vehicle.getWaitingTime,
+    tc.VAR_LANE_ID: traci.vehicle.getLaneID,
+    tc.VAR_MAXSPEED: traci.vehicle.getMaxSpeed,
+    tc.VAR_ROAD_ID: traci.vehicle.getRoadID,
+    tc.VAR_LANE_INDEX: traci.vehicle.getLaneIndex,
+}
+
+
+class StateFetcher:
+
+    def __init__(self, mode="context"):
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown state fetch mode: {mode}")
+
+        self.mode = mode
+        self.context_junction = None
+        self.lane_counts = {}
+
+    def setup(self):
+        # Must be called once after traci.start()
+        if self.mode == "subscription":
+            traci.simulation.subscribe([tc.VAR_DEPARTED_VEHICLES_IDS])
+
+            # Vehicles already in the network (restored by --load-state,
+            # or a client attaching mid-run) never report as departed
+            for vid in traci.vehicle.getIDList():
+                traci.vehicle.subscribe(vid, VEHICLE_VARS)
+
+        elif self.mode == "context":
+            (xmin, ymin), (xmax, ymax) = traci.simulation.getNetBoundary()
+            radius = math.hypot(xmax - xmin, ymax - ymin) + 1.0
+
+            self.context_junction = traci.junction.getIDList()[0]
+            traci.junction.subscribeContext(
+                self.context_junction,
+                tc.CMD_GET_VEHICLE_VARIABLE,
+                radius,
+                VEHICLE_VARS
+            )
+
+    def fetch(self):
+        """
+        Return {vehicle_id: {var_id: value}} for every vehicle in the
+        network, ordered like traci.vehicle.getIDList().
+        Call once per step, right after traci.simulationStep().
+        """
+        vehicle_ids = traci.vehicle.getIDList()
+
+        if self.mode == "polling":
+            return {
+                vid: {var: getter(vid) for var, getter in _POLLING_GETTERS.items()}
+                for vid in vehicle_ids
+            }
+
+        if self.mode == "subscription":
+            departed = traci.simulation.getSubscriptionResults().get(
+                tc.VAR_DEPARTED_VEHICLES_IDS, ()
+            )
+            for vid in departed:
+                traci.vehicle.subscribe(vid, VEHICLE_VARS)
+
+            results = traci.vehicle.getAllSubscriptionResults()
+
+        else:
+            results = traci.junction.getContextSubscriptionResults(
+                self.context_junction
+            ) or {}
+
+        return {vid: results[vid] for vid in vehicle_ids if vid in results}
+
+    def lane_count(self, edge_id):
+        # Lane counts are static topology, so they are only fetched once per
+        # edge outside the polling path.
+        if self.mode == "polling":
+            return traci.edge.getLaneNumber(edge_id)
+
+        if edge_id not in self.lane_counts:
+            self.lane_counts[edge_id] = traci.edge.getLaneNumber(edge_id)
+
+        return self.lane_counts[edge_id]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+SUMO client backend selection.
+
+libsumo runs SUMO inside the Python process and exposes the same API as
+traci without the socket round-trip per call. Scripts import the chosen
+module from here instead of importing traci directly:
+
+    from sumo_backend import traci
+
+Pick the backend with SUMO_BACKEND below or the SUMO_BACKEND environment
+variable: "auto" (libsumo when importable, else traci), "libsumo" or
+"traci". libsumo supports a single simulation per process and no
+multi-client mode (traci.init / setOrder).
+"""
+
+import os
+import importlib
+
+SUMO_BACKEND = os.environ.get("SUMO_BACKEND", "auto")
+
+BACKENDS = ("auto", "libsumo", "traci")
+
+
+def load_backend(name=SUMO_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SUMO backend: {name}")
+
+    if name == "auto":
+        try:
+            return importlib.import_module("libsumo"), "libsumo"
+        except ImportError:
+            return importlib.import_module("traci"), "traci"
+
+    return importlib.import_module(name), name
+
+
+traci, BACKEND_NAME = load_backend()
@@ -26,7 +26,7 @@ def print_status(name, success, error=None):
 
 
 def test_python_packages():
-    packages = ["osmnx", "networkx", "matplotlib", "pandas", "numpy", "torch"]
+    packages = ["osmnx", "networkx", "matplotlib", "pandas", "numpy", "torch", "pyarrow"]
     for pkg in packages:
         try:
             importlib.import_module(pkg)
@@ -3,10 +3,17 @@
 import os
 import torch
 import torch.nn as nn
+from torch.profiler import record_function
 import pandas as pd
 import numpy as np
 from sklearn.metrics import precision_score, recall_score, f1_score
 
+from world_state import load_world_state, has_dense, DENSE_DIR
+from running_stats import feature_stats
+from training_monitor import TrainingMonitor, format_epoch
+from window_dataset import SlidingWindowDataset, make_loader, num_windows
+from world_model import WorldModel, build_normalized_adjacency, save_world_model, MODEL_FILE
+
 # ------------------------------------------------------------
 # Fix working directory
 # ------------------------------------------------------------
@@ -15,7 +22,6 @@ os.chdir(PROJECT_ROOT)
 
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-STATE_FILE = "data/processed/lane_time_tensor.csv"
 GRAPH_FILE = "data/processed/lane_graph_edges.csv"
 
 WINDOW = 20
@@ -23,206 +29,223 @@ HIDDEN_DIM = 32
 EPOCHS = 15
 LR = 0.001
 BATCH_SIZE = 16
+EVAL_BATCH_SIZE = 64
+
+# DataLoader worker processes prefetching batches (0 = load in-process)
+NUM_WORKERS = min(2, os.cpu_count() or 1)
+PREFETCH_FACTOR = 4
+PIN_MEMORY = DEVICE.type == "cuda"
+
+# torch.profiler traces of a few training steps (in the run log directory)
+PROFILE = False
+
+# Wrap the model in torch.compile (PyTorch 2.x; eager when unavailable)
+COMPILE_MODEL = False
 
-# ------------------------------------------------------------
-# Load state tensor
-# ------------------------------------------------------------
-print("Loading state tensor...")
-df = pd.read_csv(STATE_FILE)
-
-lanes = sorted(df["lane_id"].unique())
-lane_to_idx = {lane: i for i, lane in enumerate(lanes)}
-num_lanes = len(lanes)
-
-times = sorted(df["time"].unique())
-num_timesteps = len(times)
-
-print("Lanes:", num_lanes)
-print("Timesteps:", num_timesteps)
-
-# ------------------------------------------------------------
-# Build feature + label tensors
-# ------------------------------------------------------------
-features = np.zeros((num_timesteps, num_lanes, 3))
-labels = np.zeros((num_timesteps, num_lanes))
 
-for _, row in df.iterrows():
-    t = int(row["time"])
-    i = lane_to_idx[row["lane_id"]]
+def main():
+    # ------------------------------------------------------------
+    # Load state tensor
+    # ------------------------------------------------------------
+    print("Loading state tensor...")
+
+    # features [T, N, F] / labels [T, N], memory-mapped (copy-on-write) when the
+    # dense build exists, so the tensor never has to fit in RAM
+    features, labels, manifest = load_world_state(mmap_mode="c")
+
+    lanes = manifest["lanes"]
+    lane_to_idx = {lane: i for i, lane in enumerate(lanes)}
+    num_lanes = len(lanes)
+    num_timesteps = features.shape[0]
+
+    print("Lanes:", num_lanes)
+    print("Timesteps:", num_timesteps)
+
+    # ------------------------------------------------------------
+    # Sliding windows (strided views, no copies)
+    # ------------------------------------------------------------
+    print("Creating sliding windows...")
 
-    features[t, i, 0] = row["mean_speed"]
-    features[t, i, 1] = row["vehicle_count"]
-    features[t, i, 2] = row["violation_rate"]
+    # Raw values; normalization is applied per batch on the device. Datasets
+    # over the dense build reopen its memory maps in each DataLoader worker
+    dense_dir = DENSE_DIR if has_dense() else None
 
-    labels[t, i] = row["future_congestion"]
+    total_samples = num_windows(num_timesteps, WINDOW)
+    print("Total samples:", total_samples)
+
+    # ------------------------------------------------------------
+    # Train / Val / Test split (time-based)
+    # ------------------------------------------------------------
+    train_end = int(0.7 * total_samples)
+    val_end = int(0.85 * total_samples)
+
+    # ------------------------------------------------------------
+    # Normalization stats (training timesteps only, streamed)
+    # ------------------------------------------------------------
+    # Training windows cover timesteps [0, train_end + WINDOW - 1)
+    mean, std = feature_stats(features, end=train_end + WINDOW - 1)
+    std = std + 1e-6
+    print("Feature mean:", np.round(mean, 4), "| std:", np.round(std, 4))
 
-# Normalize features per feature
-for f in range(features.shape[2]):
-    mean = features[:, :, f].mean()
-    std = features[:, :, f].std() + 1e-6
-    features[:, :, f] = (features[:, :, f] - mean) / std
+    mean_t = torch.tensor(mean, dtype=torch.float32, device=DEVICE)
+    std_t = torch.tensor(std, dtype=torch.float32, device=DEVICE)
 
-# ------------------------------------------------------------
-# Create sliding windows
-# ------------------------------------------------------------
-print("Creating sliding windows...")
 
-X = []
-Y = []
+    def normalize(xb):
+        return (xb - mean_t) / std_t
+
+    train_set = SlidingWindowDataset(features, labels, WINDOW, 0, train_end,
+                                     dense_dir=dense_dir)
+    val_set = SlidingWindowDataset(features, labels, WINDOW, train_end, val_end,
+                                   dense_dir=dense_dir)
+    test_set = SlidingWindowDataset(features, labels, WINDOW, val_end, total_samples,
+                                    dense_dir=dense_dir)
+
+    loader_args = dict(num_workers=NUM_WORKERS, pin_memory=PIN_MEMORY,
+                       prefetch_factor=PREFETCH_FACTOR)
 
-for t in range(WINDOW, num_timesteps):
-    X.append(features[t-WINDOW:t])
-    Y.append(labels[t])
+    train_loader = make_loader(train_set, BATCH_SIZE, shuffle=True, **loader_args)
+    val_loader = make_loader(val_set, EVAL_BATCH_SIZE, **loader_args)
+    test_loader = make_loader(test_set, EVAL_BATCH_SIZE, **loader_args)
 
-X = torch.tensor(np.array(X), dtype=torch.float32)
-Y = torch.tensor(np.array(Y), dtype=torch.float32)
+    print("Train samples:", len(train_set))
+    print("Val samples:", len(val_set))
+    print("Test samples:", len(test_set))
 
-print("Total samples:", X.shape[0])
-
-# ------------------------------------------------------------
-# Train / Val / Test split (time-based)
-# ------------------------------------------------------------
-total_samples = X.shape[0]
+    # ------------------------------------------------------------
+    # Build adjacency matrix (sparse)
+    # ------------------------------------------------------------
+    print("Building adjacency matrix...")
+    edges = pd.read_csv(GRAPH_FILE)
+
+    A_hat = build_normalized_adjacency(edges, lane_to_idx, num_lanes).to(DEVICE)
+    print("Adjacency non-zeros:", A_hat._nnz())
+
+    # ------------------------------------------------------------
+    # Model
+    # ------------------------------------------------------------
+    model = WorldModel(A_hat, in_dim=features.shape[2], hidden_dim=HIDDEN_DIM).to(DEVICE)
+    optimizer = torch.optim.Adam(model.parameters(), lr=LR)
+
+    if COMPILE_MODEL:
+        try:
+            model = torch.compile(model)
+        except Exception as e:
+            print(f"[WARN] torch.compile unavailable, using eager model -> {e}")
+
+    # Class imbalance handling
+    Y_train = train_set.label_slice()
+    pos_count = (Y_train == 1).sum().item()
+    neg_count = (Y_train == 0).sum().item()
+    pos_weight = torch.tensor(neg_count / (pos_count + 1e-6)).to(DEVICE)
+
+    criterion = nn.BCEWithLogitsLoss(pos_weight=pos_weight)
+
+
+    def evaluate(loader):
+        """Mean loss over the whole split, plus flattened labels and predictions."""
+        model.eval()
+        total_loss = 0.0
+        total_count = 0
+        y_true, y_pred = [], []
+
+        with torch.no_grad():
+            for xb, yb in loader:
+                xb = normalize(xb.to(DEVICE, non_blocking=True))
+                yb = yb.to(DEVICE, non_blocking=True)
+
+                outputs = model(xb)
+                total_loss += criterion(outputs, yb).item() * yb.numel()
+                total_count += yb.numel()
+
+                y_true.append(yb.cpu().numpy().flatten())
+                y_pred.append((torch.sigmoid(outputs) > 0.5).cpu().numpy().flatten())
+
+        return (total_loss / max(total_count, 1),
+                np.concatenate(y_true), np.concatenate(y_pred))
+
+
+    # ------------------------------------------------------------
+    # Training loop
+    # ------------------------------------------------------------
+    print("\nTraining model...\n")
+
+    monitor = TrainingMonitor({
+        "window": WINDOW, "hidden_dim": HIDDEN_DIM, "epochs": EPOCHS, "lr": LR,
+        "batch_size": BATCH_SIZE, "num_workers": NUM_WORKERS,
+        "compile": COMPILE_MODEL, "device": str(DEVICE),
+        "num_lanes": num_lanes, "num_timesteps": num_timesteps,
+        "train_samples": len(train_set),
+    }, device=DEVICE)
+    print("Run log:", monitor.run_dir)
+
+    with monitor.profiler(enabled=PROFILE) as profiler:
+
+        for epoch in range(EPOCHS):
+
+            model.train()
+            total_loss = 0
 
-train_end = int(0.7 * total_samples)
-val_end = int(0.85 * total_samples)
+            for xb, yb in monitor.batches(train_loader):
+                xb = normalize(xb.to(DEVICE, non_blocking=True))
+                yb = yb.to(DEVICE, non_blocking=True)
 
-X_train = X[:train_end].to(DEVICE)
-Y_train = Y[:train_end].to(DEVICE)
-
-X_val = X[train_end:val_end].to(DEVICE)
-Y_val = Y[train_end:val_end].to(DEVICE)
-
-X_test = X[val_end:].to(DEVICE)
-Y_test = Y[val_end:].to(DEVICE)
-
-print("Train samples:", X_train.shape[0])
-print("Val samples:", X_val.shape[0])
-print("Test samples:", X_test.shape[0])
-
-# ------------------------------------------------------------
-# Build adjacency matrix
-# ------------------------------------------------------------
-print("Building adjacency matrix...")
-edges = pd.read_csv(GRAPH_FILE)
-
-A = np.zeros((num_lanes, num_lanes))
-
-for _, row in edges.iterrows():
-    src = lane_to_idx[row["source_lane"]]
-    tgt = lane_to_idx[row["target_lane"]]
-    A[src, tgt] = 1
-
-A += np.eye(num_lanes)
-
-D = np.diag(1.0 / np.sqrt(A.sum(axis=1) + 1e-6))
-A_hat = torch.tensor(D @ A @ D, dtype=torch.float32).to(DEVICE)
-
-# ------------------------------------------------------------
-# Model
-# ------------------------------------------------------------
-class WorldModel(nn.Module):
-    def __init__(self):
-        super().__init__()
-        self.gcn = nn.Linear(3, HIDDEN_DIM)
-        self.lstm = nn.LSTM(HIDDEN_DIM, HIDDEN_DIM, batch_first=True)
-        self.fc = nn.Linear(HIDDEN_DIM, 1)
+                optimizer.zero_grad()
+                with record_function("forward"):
+                    outputs = model(xb)
+                    loss = criterion(outputs, yb)
+                with record_function("backward"):
+                    loss.backward()
+                optimizer.step()
+
+                total_loss += loss.item()
 
-    def forward(self, x):
-        # x: [B, W, N, F]
-        B, W, N, F = x.shape
+                if profiler is not None:
+                    profiler.step()
+
+            # Validation
+            val_loss, y_true, y_pred = evaluate(val_loader)
+
+            precision = precision_score(y_true, y_pred, zero_division=0)
+            recall = recall_score(y_true, y_pred, zero_division=0)
+            f1 = f1_score(y_true, y_pred, zero_division=0)
+
+            record = monitor.end_epoch(
+                epoch + 1, train_loss=total_loss, val_loss=val_loss,
+                val_precision=precision, val_recall=recall, val_f1=f1
+            )
+
+            print(f"Epoch {epoch+1}/{EPOCHS} | "
+                  f"Train Loss: {total_loss:.4f} | "
+                  f"Val Loss: {val_loss:.4f} | "
+                  f"Val F1: {f1:.4f} | "
+                  f"{format_epoch(record)}")
 
-        spatial_seq = []
+    # ------------------------------------------------------------
+    # Final Test Evaluation
+    # ------------------------------------------------------------
+    _, y_true, y_pred = evaluate(test_loader)
 
-        for t in range(W):
-            xt = x[:, t]  # [B, N, F]
-            xt = torch.relu(A_hat @ self.gcn(xt))
-            spatial_seq.append(xt)
-
-        spatial_seq = torch.stack(spatial_seq, dim=1)  # [B, W, N, H]
-
-        # reshape for LSTM
-        spatial_seq = spatial_seq.permute(0, 2, 1, 3)  # [B, N, W, H]
-        spatial_seq = spatial_seq.reshape(B * N, W, HIDDEN_DIM)
-
-        lstm_out, _ = self.lstm(spatial_seq)
-
-        last_hidden = lstm_out[:, -1, :]  # [B*N, H]
-        out = self.fc(last_hidden)  # [B*N, 1]
-
-        out = out.reshape(B, N)
-        return out
-
-model = WorldModel().to(DEVICE)
-optimizer = torch.optim.Adam(model.parameters(), lr=LR)
-
-# Class imbalance handling
-pos_count = (Y_train == 1).sum().item()
-neg_count = (Y_train == 0).sum().item()
-pos_weight = torch.tensor(neg_count / (pos_count + 1e-6)).to(DEVICE)
-
-criterion = nn.BCEWithLogitsLoss(pos_weight=pos_weight)
-
-# ------------------------------------------------------------
-# Training loop
-# ------------------------------------------------------------
-print("\nTraining model...\n")
-
-for epoch in range(EPOCHS):
-
-    model.train()
-    perm = torch.randperm(X_train.shape[0])
-    total_loss = 0
-
-    for i in range(0, X_train.shape[0], BATCH_SIZE):
-        idx = perm[i:i+BATCH_SIZE]
-        xb = X_train[idx]
-        yb = Y_train[idx]
-
-        optimizer.zero_grad()
-        outputs = model(xb)
-        loss = criterion(outputs, yb)
-        loss.backward()
-        optimizer.step()
-
-        total_loss += loss.item()
-
-    # Validation
-    model.eval()
-    with torch.no_grad():
-        val_outputs = model(X_val)
-        val_loss = criterion(val_outputs, Y_val)
-
-        preds = torch.sigmoid(val_outputs) > 0.5
-        y_true = Y_val.cpu().numpy().flatten()
-        y_pred = preds.cpu().numpy().flatten()
+    precision = precision_score(y_true, y_pred, zero_division=0)
+    recall = recall_score(y_true, y_pred, zero_division=0)
+    f1 = f1_score(y_true, y_pred, zero_division=0)
 
-        precision = precision_score(y_true, y_pred, zero_division=0)
-        recall = recall_score(y_true, y_pred, zero_division=0)
-        f1 = f1_score(y_true, y_pred, zero_division=0)
+    print("\nTest Results:")
+    print("Precision:", precision)
+    print("Recall:", recall)
+    print("F1:", f1)
 
-    print(f"Epoch {epoch+1}/{EPOCHS} | "
-          f"Train Loss: {total_loss:.4f} | "
-          f"Val Loss: {val_loss.item():.4f} | "
-          f"Val F1: {f1:.4f}")
+    monitor.save(test_precision=precision, test_recall=recall, test_f1=f1)
 
-# ------------------------------------------------------------
-# Final Test Evaluation
-# ------------------------------------------------------------
-model.eval()
-with torch.no_grad():
-    test_outputs = model(X_test)
-    preds = torch.sigmoid(test_outputs) > 0.5
+    # ------------------------------------------------------------
+    # Save model for online inference (see online_inference.py)
+    # ------------------------------------------------------------
+    save_world_model(MODEL_FILE, model, lanes, mean, std, WINDOW,
+                     feature_names=manifest["features"])
+    print("\nSaved model:", MODEL_FILE)
 
-    y_true = Y_test.cpu().numpy().flatten()
-    y_pred = preds.cpu().numpy().flatten()
+    print("\nTraining complete.")
 
-    precision = precision_score(y_true, y_pred, zero_division=0)
-    recall = recall_score(y_true, y_pred, zero_division=0)
-    f1 = f1_score(y_true, y_pred, zero_division=0)
 
-print("\nTest Results:")
-print("Precision:", precision)
-print("Recall:", recall)
-print("F1:", f1)
-print("\nTraining complete.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
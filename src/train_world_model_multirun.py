@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+Train the world model on every run of the shard manifest (see
+world_state_shards.py) with DistributedDataParallel on CPU: WORLD_SIZE
+processes on the gloo backend, each training on its DistributedSampler
+share of the windows with its own DataLoader workers.
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data.distributed import DistributedSampler
+from sklearn.metrics import precision_score, recall_score, f1_score
+
+from local_ports import free_port
+from training_monitor import TrainingMonitor, format_epoch
+from window_dataset import make_loader
+from world_model import WorldModel, build_normalized_adjacency, save_world_model
+from world_state_shards import MultiRunWindowDataset, load_shard_manifest, SHARD_MANIFEST
+
+# ------------------------------------------------------------
+# Fix working directory
+# ------------------------------------------------------------
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_ROOT)
+
+GRAPH_FILE = "data/processed/lane_graph_edges.csv"
+MODEL_FILE = "data/models/world_model_multirun.pt"
+
+WINDOW = 20
+HIDDEN_DIM = 32
+EPOCHS = 15
+LR = 0.001
+BATCH_SIZE = 16  # per process
+EVAL_BATCH_SIZE = 64
+SEED = 42
+
+# Training processes, and DataLoader workers per process
+WORLD_SIZE = max(1, (os.cpu_count() or 1) // 2)
+NUM_WORKERS = 1
+PREFETCH_FACTOR = 4
+
+
+def evaluate(model, loader, criterion, mean, std):
+    model.eval()
+    total_loss = 0.0
+    total_count = 0
+    y_true, y_pred = [], []
+
+    with torch.no_grad():
+        for xb, yb in loader:
+            outputs = model((xb - mean) / std)
+            total_loss += criterion(outputs, yb).item() * yb.numel()
+            total_count += yb.numel()
+
+            y_true.append(yb.numpy().flatten())
+            y_pred.append((torch.sigmoid(outputs) > 0.5).numpy().flatten())
+
+    return (total_loss / max(total_count, 1),
+            np.concatenate(y_true), np.concatenate(y_pred))
+
+
+def train(rank, world_size, port, manifest, edges, mean, std, pos_weight):
+    os.environ["MASTER_ADDR"] = "localhost"
+    os.environ["MASTER_PORT"] = str(port)
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+
+    # Share the cores between ranks instead of oversubscribing them
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+    torch.manual_seed(SEED)
+
+    try:
+        lanes = manifest["lanes"]
+        lane_to_idx = {lane: i for i, lane in enumerate(lanes)}
+        mean_t = torch.tensor(mean, dtype=torch.float32)
+        std_t = torch.tensor(std, dtype=torch.float32)
+
+        train_set = MultiRunWindowDataset(manifest, WINDOW, "train")
+        sampler = DistributedSampler(train_set, world_size, rank, shuffle=True, seed=SEED)
+        train_loader = make_loader(train_set, BATCH_SIZE, sampler=sampler,
+                                   num_workers=NUM_WORKERS, prefetch_factor=PREFETCH_FACTOR)
+
+        a_hat = build_normalized_adjacency(edges, lane_to_idx, len(lanes))
+        model = WorldModel(a_hat, in_dim=len(manifest["features"]), hidden_dim=HIDDEN_DIM)
+
+        # The adjacency is fixed and identical everywhere: no buffer sync
+        ddp_model = DistributedDataParallel(model, broadcast_buffers=False)
+        optimizer = torch.optim.Adam(ddp_model.parameters(), lr=LR)
+        criterion = nn.BCEWithLogitsLoss(pos_weight=torch.tensor(pos_weight))
+
+        # Timings of rank 0's share stand in for every rank
+        monitor = None
+        if rank == 0:
+            monitor = TrainingMonitor({
+                "window": WINDOW, "hidden_dim": HIDDEN_DIM, "epochs": EPOCHS,
+                "lr": LR, "batch_size": BATCH_SIZE, "world_size": world_size,
+                "num_workers": NUM_WORKERS, "runs": len(manifest["shards"]),
+                "num_lanes": len(lanes), "train_samples": len(train_set),
+            }, run_name=time.strftime("multirun_%Y%m%d_%H%M%S"))
+            val_loader = make_loader(MultiRunWindowDataset(manifest, WINDOW, "val"),
+                                     EVAL_BATCH_SIZE)
+            print(f"\nTraining on {world_size} processes, "
+                  f"{len(train_set)} windows ({len(sampler)} per process)...\n")
+
+        for epoch in range(EPOCHS):
+            sampler.set_epoch(epoch)
+            ddp_model.train()
+            total_loss = torch.zeros(2)
+
+            for xb, yb in (monitor.batches(train_loader) if monitor else train_loader):
+                optimizer.zero_grad()
+                loss = criterion(ddp_model((xb - mean_t) / std_t), yb)
+                loss.backward()
+                optimizer.step()
+
+                total_loss += torch.tensor([loss.item(), 1.0])
+
+            dist.all_reduce(total_loss)
+
+            if rank == 0:
+                train_loss = float(total_loss[0] / max(total_loss[1], 1))
+                val_loss, y_true, y_pred = evaluate(model, val_loader, criterion, mean_t, std_t)
+                f1 = f1_score(y_true, y_pred, zero_division=0)
+                record = monitor.end_epoch(epoch + 1, train_loss=train_loss,
+                                           val_loss=val_loss, val_f1=f1)
+                print(f"Epoch {epoch+1}/{EPOCHS} | "
+                      f"Train Loss: {train_loss:.4f} | "
+                      f"Val Loss: {val_loss:.4f} | "
+                      f"Val F1: {f1:.4f} | "
+                      f"{format_epoch(record)}")
+
+            dist.barrier()
+
+        if rank == 0:
+            test_loader = make_loader(MultiRunWindowDataset(manifest, WINDOW, "test"),
+                                      EVAL_BATCH_SIZE)
+            _, y_true, y_pred = evaluate(model, test_loader, criterion, mean_t, std_t)
+
+            precision = precision_score(y_true, y_pred, zero_division=0)
+            recall = recall_score(y_true, y_pred, zero_division=0)
+            f1 = f1_score(y_true, y_pred, zero_division=0)
+
+            print("\nTest Results:")
+            print("Precision:", precision)
+            print("Recall:", recall)
+            print("F1:", f1)
+
+            monitor.save(test_precision=precision, test_recall=recall, test_f1=f1)
+
+            save_world_model(MODEL_FILE, model, lanes, mean, std, WINDOW,
+                             feature_names=manifest["features"])
+            print("\nSaved model:", MODEL_FILE)
+
+    finally:
+        dist.destroy_process_group()
+
+
+if __name__ == "__main__":
+    print("Loading shard manifest...")
+    manifest = load_shard_manifest(SHARD_MANIFEST)
+    print("Runs:", len(manifest["shards"]))
+    print("Lanes:", len(manifest["lanes"]))
+
+    # Normalization stats and class balance from the training split only
+    train_set = MultiRunWindowDataset(manifest, WINDOW, "train")
+    mean, std = train_set.feature_stats()
+    std = std + 1e-6
+    pos_count, neg_count = train_set.label_counts()
+    pos_weight = neg_count / (pos_count + 1e-6)
+
+    print("Train windows:", len(train_set))
+    print("Feature mean:", np.round(mean, 4), "| std:", np.round(std, 4))
+
+    edges = pd.read_csv(GRAPH_FILE)
+
+    mp.spawn(
+        train,
+        args=(WORLD_SIZE, free_port(), manifest, edges, mean, std, pos_weight),
+        nprocs=WORLD_SIZE,
+        join=True
+    )
+
+    print("\nTraining complete.")
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+"""
+Where training time goes, per epoch: wall time, samples/sec, time spent
+waiting on the DataLoader versus computing, and peak RSS. Every run gets
+its own directory under RUN_LOG_ROOT:
+
+    results/training_runs/<run name>/run.json     (config + all epochs)
+    results/training_runs/<run name>/epochs.csv   (one row per epoch)
+    results/training_runs/<run name>/profiler/    (torch.profiler traces)
+
+Profiling is optional: profiler() returns a torch.profiler context that
+records a few training steps (see PROFILE_* below) with the "forward" /
+"backward" ranges marked by the trainer; the traces open in TensorBoard
+or chrome://tracing.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+from contextlib import nullcontext
+
+import torch
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUN_LOG_ROOT = "results/training_runs"
+
+# torch.profiler schedule: skip, warm up, then record this many steps
+PROFILE_WAIT = 1
+PROFILE_WARMUP = 1
+PROFILE_ACTIVE = 3
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class TrainingMonitor:
+
+    def __init__(self, config, run_name=None, root=RUN_LOG_ROOT, device=None):
+        self.run_name = run_name or time.strftime("train_%Y%m%d_%H%M%S")
+        self.run_dir = os.path.join(root, self.run_name)
+        os.makedirs(self.run_dir, exist_ok=True)
+
+        self.config = config
+        self.epochs = []
+        self.started = time.perf_counter()
+
+        # CUDA kernels run asynchronously; sync so compute time is real
+        self.sync = device is not None and torch.device(device).type == "cuda"
+
+        self._reset_epoch()
+
+    def _reset_epoch(self):
+        self.epoch_started = time.perf_counter()
+        self.train_ended = None
+        self.data_time = 0.0
+        self.samples = 0
+        self.batches_seen = 0
+
+    def batches(self, loader):
+        """Iterate `loader`, timing how long each batch took to arrive."""
+        self._reset_epoch()
+        iterator = iter(loader)
+
+        while True:
+            if self.sync:
+                torch.cuda.synchronize()
+            waited = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                self.train_ended = time.perf_counter()
+                return
+            self.data_time += time.perf_counter() - waited
+
+            self.batches_seen += 1
+            self.samples += len(batch[0])
+            yield batch
+
+    def end_epoch(self, epoch, **metrics):
+        """Close the epoch's timings; `metrics` (losses, F1...) are stored alongside."""
+        if self.sync:
+            torch.cuda.synchronize()
+        now = time.perf_counter()
+        epoch_time = now - self.epoch_started
+        train_time = (self.train_ended or now) - self.epoch_started
+
+        record = {
+            "epoch": epoch,
+            "epoch_time_s": epoch_time,
+            "samples": self.samples,
+            "batches": self.batches_seen,
+            "train_time_s": train_time,
+            "samples_per_s": self.samples / train_time if train_time > 0 else 0.0,
+            # Training loop split into waiting for batches and everything
+            # else (forward, backward, optimizer step)
+            "data_time_s": self.data_time,
+            "compute_time_s": train_time - self.data_time,
+            "data_fraction": self.data_time / train_time if train_time > 0 else 0.0,
+            # Validation etc. after the last batch
+            "eval_time_s": epoch_time - train_time,
+            "peak_rss_mb": peak_rss_mb(),
+            **{k: float(v) for k, v in metrics.items()},
+        }
+        self.epochs.append(record)
+        self.save()
+
+        return record
+
+    def profiler(self, enabled=True):
+        """torch.profiler context for the training loop; call .step() per batch."""
+        if not enabled:
+            return nullcontext(None)
+
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if self.sync:
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+        return torch.profiler.profile(
+            activities=activities,
+            schedule=torch.profiler.schedule(
+                wait=PROFILE_WAIT, warmup=PROFILE_WARMUP, active=PROFILE_ACTIVE, repeat=1
+            ),
+            on_trace_ready=torch.profiler.tensorboard_trace_handler(
+                os.path.join(self.run_dir, "profiler")
+            ),
+            record_shapes=True,
+            profile_memory=True
+        )
+
+    def save(self, **summary):
+        with open(os.path.join(self.run_dir, "run.json"), "w") as f:
+            json.dump({
+                "run_name": self.run_name,
+                "config": self.config,
+                "total_time_s": time.perf_counter() - self.started,
+                "epochs": self.epochs,
+                **summary,
+            }, f, indent=2)
+
+        if self.epochs:
+            with open(os.path.join(self.run_dir, "epochs.csv"), "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(self.epochs[0]))
+                writer.writeheader()
+                writer.writerows(self.epochs)
+
+
+def format_epoch(record):
+    return (f"{record['epoch_time_s']:.1f}s | "
+            f"{record['samples_per_s']:.0f} samples/s | "
+            f"data {100 * record['data_fraction']:.0f}%")
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+
+"""
+Vehicle log sinks and loader.
+
+The simulation hands each step's columns to a sink instead of writing
+one CSV row per vehicle. ParquetLogSink buffers steps and flushes them
+as Arrow record batches, with ``vehicle_id``, ``lane_id`` and
+``violation_type`` dictionary-encoded. CsvLogSink keeps the original CSV
+format available.
+
+Each Parquet flush is written as its own complete part file next to the
+log (``vehicle_log.parquet.parts/part_000000.parquet`` ...), so
+everything flushed so far stays readable even if the process is killed
+outright (segfault, SIGKILL, OOM) before a Parquet footer could be
+written. close() joins the parts into ``vehicle_log.parquet``; after a
+crash the loaders and merge_logs() read the parts directly.
+
+ThreadedLogSink wraps either sink so serialization runs on a background
+writer thread fed through a bounded queue, off the simulation thread.
+
+Downstream scripts read the log through load_vehicle_log(), which picks
+whichever format was written most recently.
+
+Usage (join leftover parts if any, convert the Parquet log to CSV):
+    python src/vehicle_log.py
+"""
+
+import os
+import csv
+import glob
+import shutil
+import queue
+import threading
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+LOG_DIR = "data/logs"
+CSV_LOG_FILE = os.path.join(LOG_DIR, "vehicle_log.csv")
+PARQUET_LOG_FILE = os.path.join(LOG_DIR, "vehicle_log.parquet")
+
+LOG_COLUMNS = [
+    "time", "vehicle_id", "x", "y",
+    "speed", "waiting_time", "lane_id",
+    "violation_type"
+]
+
+ROW_GROUP_SIZE = 100_000
+WRITER_QUEUE_STEPS = 64
+
+PARTS_SUFFIX = ".parts"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError(
+            "pyarrow is required for Parquet logs "
+            "(pip install pyarrow), or set LOG_FORMAT = \"csv\""
+        )
+
+
+def part_files(path):
+    """Completed part files of the Parquet log `path`, in write order."""
+    return sorted(glob.glob(os.path.join(path + PARTS_SUFFIX, "part_*.parquet")))
+
+
+def parquet_sources(path):
+    """The finished log file, else the parts a crashed run left behind."""
+    if os.path.exists(path):
+        return [path]
+
+    parts = part_files(path)
+    if not parts and not os.path.isdir(path + PARTS_SUFFIX):
+        raise FileNotFoundError(f"No Parquet log at {path}")
+    return parts
+
+
+def join_parts(path, schema=None):
+    """
+    Stream the part files of `path` into the single Parquet file `path`
+    (one row group per part), then remove the parts.
+    """
+    _require_pyarrow()
+    parts = part_files(path)
+    tmp_file = path + ".tmp"
+    writer = None
+
+    try:
+        for part in parts:
+            table = pq.read_table(part)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_file, table.schema)
+            writer.write_table(table, row_group_size=max(len(table), 1))
+
+        if writer is None:
+            # Nothing was flushed: an empty log with the sink's schema
+            writer = pq.ParquetWriter(tmp_file, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    os.replace(tmp_file, path)
+    shutil.rmtree(path + PARTS_SUFFIX, ignore_errors=True)
+
+
+class CsvLogSink:
+
+    def __init__(self, path=CSV_LOG_FILE, buffer_rows=ROW_GROUP_SIZE):
+        self.path = path
+        self.buffer_rows = buffer_rows
+        self.rows = []
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(LOG_COLUMNS)
+
+    def write_step(self, step, vehicle_ids, x, y, speed, waiting, lane_ids,
+                   violation_type):
+        self.rows.extend(zip(
+            [step] * len(vehicle_ids), vehicle_ids, x, y,
+            speed, waiting, lane_ids, violation_type
+        ))
+
+        if len(self.rows) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        self.writer.writerows(self.rows)
+        self.rows = []
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+
+class ParquetLogSink:
+
+    def __init__(self, path=PARQUET_LOG_FILE, row_group_size=ROW_GROUP_SIZE):
+        _require_pyarrow()
+
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = pa.schema([
+            ("time", pa.int32()),
+            ("vehicle_id", pa.dictionary(pa.int32(), pa.string())),
+            ("x", pa.float64()),
+            ("y", pa.float64()),
+            ("speed", pa.float64()),
+            ("waiting_time", pa.float64()),
+            ("lane_id", pa.dictionary(pa.int32(), pa.string())),
+            ("violation_type", pa.dictionary(pa.int32(), pa.string())),
+        ])
+
+        # Start clean: a stale log or parts from an earlier run must not
+        # be mistaken for this run's output
+        self.part_dir = path + PARTS_SUFFIX
+        shutil.rmtree(self.part_dir, ignore_errors=True)
+        if os.path.exists(path):
+            os.remove(path)
+        os.makedirs(self.part_dir)
+
+        self.num_parts = 0
+        self.closed = False
+        self.batches = []
+        self.buffered_rows = 0
+
+    def write_step(self, step, vehicle_ids, x, y, speed, waiting, lane_ids,
+                   violation_type):
+        n = len(vehicle_ids)
+        if n == 0:
+            return
+
+        self.batches.append(pa.RecordBatch.from_arrays([
+            pa.array([step] * n, type=pa.int32()),
+            pa.array(vehicle_ids, type=pa.string()).dictionary_encode(),
+            pa.array(x, type=pa.float64()),
+            pa.array(y, type=pa.float64()),
+            pa.array(speed, type=pa.float64()),
+            pa.array(waiting, type=pa.float64()),
+            pa.array(lane_ids, type=pa.string()).dictionary_encode(),
+            pa.array(list(violation_type), type=pa.string()).dictionary_encode(),
+        ], schema=self.schema))
+        self.buffered_rows += n
+
+        if self.buffered_rows >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batches:
+            return
+
+        # One closed part file per flush, renamed into place once complete;
+        # dictionaries are unified across steps
+        table = pa.Table.from_batches(self.batches).unify_dictionaries()
+        part_file = os.path.join(self.part_dir, f"part_{self.num_parts:06d}.parquet")
+        pq.write_table(table.combine_chunks(), part_file + ".tmp",
+                       row_group_size=self.buffered_rows)
+        os.replace(part_file + ".tmp", part_file)
+
+        self.num_parts += 1
+        self.batches = []
+        self.buffered_rows = 0
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        join_parts(self.path, self.schema)
+
+
+class ThreadedLogSink:
+    """
+    Runs another sink's write_step() on a writer thread.
+
+    The queue holds at most ``max_queued_steps`` steps; when the writer
+    falls behind, write_step() blocks (backpressure) instead of letting
+    the buffer grow. close() drains the queue, then flushes and closes the
+    wrapped sink. An error on the writer thread is re-raised on the
+    simulation thread at the next write_step() or close().
+    """
+
+    _STOP = object()
+
+    def __init__(self, sink, max_queued_steps=WRITER_QUEUE_STEPS):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=max_queued_steps)
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(
+            target=self._drain, name="vehicle-log-writer", daemon=True
+        )
+        self.thread.start()
+
+    def _drain(self):
+        while True:
+            item = self.queue.get()
+            if item is self._STOP:
+                return
+
+            if self.error is None:
+                try:
+                    self.sink.write_step(*item)
+                except BaseException as e:
+                    # Keep draining so the producer never blocks forever
+                    self.error = e
+
+    def _raise_writer_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Vehicle log writer thread failed") from error
+
+    def write_step(self, step, vehicle_ids, x, y, speed, waiting, lane_ids,
+                   violation_type):
+        self._raise_writer_error()
+        self.queue.put((step, vehicle_ids, x, y, speed, waiting, lane_ids,
+                        violation_type))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        self.queue.put(self._STOP)
+        self.thread.join()
+
+        try:
+            self._raise_writer_error()
+        finally:
+            self.sink.close()
+
+
+def open_log_sink(log_format="parquet", threaded=False, log_dir=LOG_DIR):
+    if log_format == "parquet":
+        sink = ParquetLogSink(os.path.join(log_dir, "vehicle_log.parquet"))
+    elif log_format == "csv":
+        sink = CsvLogSink(os.path.join(log_dir, "vehicle_log.csv"))
+    else:
+        raise ValueError(f"Unknown log format: {log_format}")
+
+    return ThreadedLogSink(sink) if threaded else sink
+
+
+def merge_logs(paths, out_path):
+    """
+    Merge per-shard logs (all Parquet or all CSV) into one log ordered by
+    time. The sort is stable, so rows keep their shard order within a step.
+    A Parquet shard that never finished contributes its part files.
+    """
+    if out_path.endswith(".parquet"):
+        _require_pyarrow()
+        sources = [source for p in paths for source in parquet_sources(p)]
+        table = pa.concat_tables([pq.read_table(source) for source in sources])
+        table = table.unify_dictionaries().combine_chunks()
+        table = table.sort_by("time")
+        pq.write_table(table, out_path, row_group_size=ROW_GROUP_SIZE)
+    else:
+        merged = pd.concat([pd.read_csv(p) for p in paths], ignore_index=True)
+        merged.sort_values("time", kind="stable").to_csv(out_path, index=False)
+
+
+def latest_log_file():
+    candidates = [p for p in (PARQUET_LOG_FILE, CSV_LOG_FILE) if os.path.exists(p)]
+    if not candidates and part_files(PARQUET_LOG_FILE):
+        # Only the parts of a run that crashed
+        return PARQUET_LOG_FILE
+    if not candidates:
+        raise FileNotFoundError(f"No vehicle log found in {LOG_DIR}")
+    return max(candidates, key=os.path.getmtime)
+
+
+def load_vehicle_log(path=None, columns=None):
+    """
+    Load the vehicle log as a DataFrame. Parquet logs keep the dictionary
+    columns as pandas categoricals.
+    """
+    path = path or latest_log_file()
+
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        tables = [pq.read_table(source, columns=columns) for source in parquet_sources(path)]
+        if not tables:
+            return pd.DataFrame(columns=columns or LOG_COLUMNS)
+        return pa.concat_tables(tables).to_pandas()
+
+    return pd.read_csv(path, usecols=columns)
+
+
+def iter_vehicle_log(path=None, columns=None, chunk_rows=ROW_GROUP_SIZE):
+    """
+    Stream the vehicle log as DataFrame chunks of about `chunk_rows` rows,
+    in file (= time) order, without loading the whole log.
+    """
+    path = path or latest_log_file()
+
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        for source in parquet_sources(path):
+            parquet_file = pq.ParquetFile(source)
+            for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+                yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def export_csv(parquet_path=PARQUET_LOG_FILE, csv_path=CSV_LOG_FILE):
+    header = True
+
+    with open(csv_path, "w", newline="") as f:
+        for chunk in iter_vehicle_log(parquet_path):
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+
+
+if __name__ == "__main__":
+    if not os.path.exists(PARQUET_LOG_FILE) and part_files(PARQUET_LOG_FILE):
+        join_parts(PARQUET_LOG_FILE)
+        print(f"[PASS] Joined the parts of an interrupted run into {PARQUET_LOG_FILE}")
+
+    export_csv()
+    print(f"[PASS] Exported {PARQUET_LOG_FILE} to {CSV_LOG_FILE}")
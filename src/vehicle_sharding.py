@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+Vehicle-to-worker assignment for multi-client runs.
+
+Every worker sees the same vehicle states each step, so ownership is
+computed independently (and identically) by each worker without any
+communication:
+
+* ``hash``   - crc32 of the vehicle ID modulo the shard count
+* ``region`` - vertical strip of the network boundary containing the
+               position where the vehicle was first seen; the owner is
+               sticky so a vehicle keeps its behavior state for its trip
+
+Contagion is the one piece of behavior state that crosses shards: a
+violation in one shard raises the pressure on nearby vehicles owned by
+any other. ViolationExchange relays each shard's violation events to all
+other shards through queues hosted by the coordinator, so every shard's
+ContagionIndex sees the whole network's violations whatever the shard
+count or mode.
+"""
+
+import zlib
+import queue
+import numpy as np
+
+SHARD_MODES = ("hash", "region")
+
+
+class ShardAssigner:
+
+    def __init__(self, shard_index, num_shards, mode="hash", x_bounds=None):
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Unknown shard mode: {mode}")
+        if mode == "region" and x_bounds is None:
+            raise ValueError("Region sharding needs the network x bounds")
+
+        self.shard_index = shard_index
+        self.num_shards = num_shards
+        self.mode = mode
+        self.x_bounds = x_bounds
+        self.owner = {}
+
+    def _region_of(self, x):
+        xmin, xmax = self.x_bounds
+        width = (xmax - xmin) / self.num_shards
+        region = int((x - xmin) // width) if width > 0 else 0
+        return min(max(region, 0), self.num_shards - 1)
+
+    def owned_mask(self, vehicle_ids, xs):
+        owned = np.empty(len(vehicle_ids), dtype=bool)
+
+        for i, vid in enumerate(vehicle_ids):
+            shard = self.owner.get(vid)
+
+            if shard is None:
+                if self.mode == "hash":
+                    shard = zlib.crc32(vid.encode()) % self.num_shards
+                else:
+                    shard = self._region_of(xs[i])
+                self.owner[vid] = shard
+
+            owned[i] = shard == self.shard_index
+
+        return owned
+
+    def release(self, vehicle_ids):
+        for vid in vehicle_ids:
+            self.owner.pop(vid, None)
+
+
+class ViolationExchange:
+    """
+    Per-shard end of the violation broadcast. `inboxes` holds one queue
+    per shard (multiprocessing.Manager queues, so puts are visible to the
+    other processes as soon as they return).
+
+    publish() the step's events before the next simulationStep(); SUMO
+    only finishes a step once every client has requested it, so after
+    simulationStep() returns, every shard's events of the previous steps
+    have arrived. A shard that is already ahead may also have published
+    the current step's events; receive(step) holds those back, so each
+    shard sees other shards' violations exactly when a single loop would
+    (from the next step on).
+    """
+
+    def __init__(self, shard_index, inboxes):
+        self.shard_index = shard_index
+        self.inboxes = inboxes
+        self.pending = []
+
+    def publish(self, events):
+        if not events:
+            return
+        for k, inbox in enumerate(self.inboxes):
+            if k != self.shard_index:
+                inbox.put(events)
+
+    def receive(self, step):
+        """Other shards' (step, x, y) events from before `step`."""
+        inbox = self.inboxes[self.shard_index]
+        while True:
+            try:
+                self.pending.extend(inbox.get_nowait())
+            except queue.Empty:
+                break
+
+        ready = [event for event in self.pending if event[0] < step]
+        self.pending = [event for event in self.pending if event[0] >= step]
+        return ready
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+Array-backed per-vehicle behavior state.
+
+Vehicle IDs are interned to integer slots and every column lives in a
+preallocated NumPy array. Slots of arrived vehicles go back on a free
+list and are reused, so memory stays flat over long runs. Columns grow
+by doubling when all slots are taken.
+"""
+
+import numpy as np
+
+NO_TIMER = -1
+
+# column name -> (dtype, fill value for a fresh slot)
+COLUMNS = {
+    "aggressiveness": (np.float64, 0.0),
+    "capability": (np.float64, 0.0),
+    "surge_cooldown": (np.int64, 0),
+    "surge_until": (np.int64, NO_TIMER),
+    "wrong_way_until": (np.int64, NO_TIMER),
+}
+
+
+class VehicleStateTable:
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.slot_of = {}
+        self.vehicle_of = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+
+        for name, (dtype, fill) in COLUMNS.items():
+            setattr(self, name, np.full(capacity, fill, dtype=dtype))
+
+    def _grow(self):
+        old = self.capacity
+        self.capacity = old * 2
+
+        for name, (dtype, fill) in COLUMNS.items():
+            column = np.full(self.capacity, fill, dtype=dtype)
+            column[:old] = getattr(self, name)
+            setattr(self, name, column)
+
+        self.vehicle_of.extend([None] * old)
+        self.free.extend(range(self.capacity - 1, old - 1, -1))
+
+    def intern(self, vehicle_ids):
+        """
+        Return (slots, new_slots): the slot of every ID in order, and the
+        slots that were assigned in this call and still need initializing.
+        """
+        slots = np.empty(len(vehicle_ids), dtype=np.int64)
+        new_slots = []
+
+        for i, vid in enumerate(vehicle_ids):
+            slot = self.slot_of.get(vid)
+
+            if slot is None:
+                if not self.free:
+                    self._grow()
+                slot = self.free.pop()
+                self.slot_of[vid] = slot
+                self.vehicle_of[slot] = vid
+                new_slots.append(slot)
+
+            slots[i] = slot
+
+        return slots, np.array(new_slots, dtype=np.int64)
+
+    def release(self, vehicle_ids):
+        for vid in vehicle_ids:
+            slot = self.slot_of.pop(vid, None)
+            if slot is None:
+                continue
+
+            for name, (_, fill) in COLUMNS.items():
+                getattr(self, name)[slot] = fill
+
+            self.vehicle_of[slot] = None
+            self.free.append(slot)
+
+    def __len__(self):
+        return len(self.slot_of)
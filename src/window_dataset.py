@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+Zero-copy sliding-window dataset over the world-state tensor.
+
+Windows are strided views (Tensor.unfold) into one base [T, N, F] tensor,
+so every timestep is stored once no matter how many windows contain it.
+Only the batches handed out by the DataLoader are materialized.
+
+Sample k is the window features[k : k + window] with label
+labels[k + window], i.e. the same pairs the trainer used to build by
+stacking slices.
+
+Built from a dense world-state directory (`dense_dir`), the dataset reopens
+the memory maps in each DataLoader worker instead of pickling the tensor.
+"""
+
+import torch
+from torch.utils.data import Dataset, DataLoader
+
+from world_state import load_dense
+
+
+class SlidingWindowDataset(Dataset):
+
+    def __init__(self, features, labels, window, start=0, end=None, dense_dir=None):
+        # features: [T, N, F], labels: [T, N], tensors or arrays (not copied);
+        # with dense_dir, the memory maps of that build
+        self.window = window
+        self.dense_dir = dense_dir
+        self._attach(features, labels)
+
+        num_samples = num_windows(features.shape[0], window)
+        self.start = start
+        self.end = num_samples if end is None else min(end, num_samples)
+
+    def _attach(self, features, labels):
+        self.labels = torch.as_tensor(labels)
+
+        # [T - W + 1, N, F, W] view; drop the last window (no label after it)
+        self.windows = torch.as_tensor(features).unfold(0, self.window, 1)[:-1]
+
+    def __getstate__(self):
+        # Memory maps are reopened in each worker, not pickled
+        state = self.__dict__.copy()
+        if self.dense_dir is not None:
+            state["labels"] = state["windows"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.dense_dir is not None:
+            features, labels, _ = load_dense(self.dense_dir, mmap_mode="c")
+            self._attach(features, labels)
+
+    def __len__(self):
+        return max(self.end - self.start, 0)
+
+    def __getitem__(self, k):
+        i = self.start + k
+        # [N, F, W] -> [W, N, F]
+        return self.windows[i].permute(2, 0, 1), self.labels[i + self.window]
+
+    def label_slice(self):
+        """Labels of every sample in this split, as a view."""
+        return self.labels[self.start + self.window:self.end + self.window]
+
+
+def num_windows(num_timesteps, window):
+    return max(num_timesteps - window, 0)
+
+
+def make_loader(dataset, batch_size, shuffle=False, num_workers=0,
+                pin_memory=False, prefetch_factor=2, sampler=None):
+    kwargs = {}
+    if num_workers > 0:
+        kwargs["prefetch_factor"] = prefetch_factor
+        kwargs["persistent_workers"] = True
+
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=shuffle if sampler is None else False,
+        sampler=sampler,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        **kwargs
+    )
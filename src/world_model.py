@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lane-graph world model: a graph convolution over the lane adjacency per
+timestep, followed by an LSTM over the window for every lane.
+
+The normalized adjacency is a sparse COO tensor built straight from the
+edge list, so memory and propagation cost are O(E) instead of O(N^2).
+The spatial step is independent across timesteps, so forward() runs it
+for the whole [B*W] batch in one sparse matmul.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+
+MODEL_FILE = "data/models/world_model.pt"
+
+
+def build_normalized_adjacency(edges, lane_to_idx, num_lanes):
+    """
+    D^-1/2 (A + I) D^-1/2 as a sparse [N, N] tensor, with D the row sums
+    of A + I. `edges` has source_lane / target_lane columns; edges that
+    touch lanes outside `lane_to_idx` are dropped.
+    """
+    src = pd.Series(edges["source_lane"]).map(lane_to_idx)
+    tgt = pd.Series(edges["target_lane"]).map(lane_to_idx)
+    known = src.notna() & tgt.notna()
+
+    # Duplicate edges count once, as in a 0/1 adjacency matrix
+    pairs = np.unique(
+        src[known].to_numpy(np.int64) * num_lanes + tgt[known].to_numpy(np.int64)
+    )
+    self_loops = np.arange(num_lanes, dtype=np.int64)
+
+    rows = np.concatenate([pairs // num_lanes, self_loops])
+    cols = np.concatenate([pairs % num_lanes, self_loops])
+    values = np.ones(len(rows))
+
+    degree = np.bincount(rows, weights=values, minlength=num_lanes)
+    d_inv_sqrt = 1.0 / np.sqrt(degree + 1e-6)
+    values = values * d_inv_sqrt[rows] * d_inv_sqrt[cols]
+
+    return torch.sparse_coo_tensor(
+        torch.from_numpy(np.stack([rows, cols])),
+        torch.from_numpy(values).float(),
+        (num_lanes, num_lanes),
+        check_invariants=True
+    ).coalesce()
+
+
+def sparse_propagate(a_hat, x):
+    """A_hat @ x for x of shape [B, N, H], with sparse A_hat [N, N]."""
+    B, N, H = x.shape
+    x = x.permute(1, 0, 2).reshape(N, B * H)
+    out = torch.sparse.mm(a_hat, x)
+    return out.reshape(N, B, H).permute(1, 0, 2)
+
+
+class WorldModel(nn.Module):
+    def __init__(self, a_hat, in_dim=3, hidden_dim=32):
+        super().__init__()
+        self.hidden_dim = hidden_dim
+        self.gcn = nn.Linear(in_dim, hidden_dim)
+        self.lstm = nn.LSTM(hidden_dim, hidden_dim, batch_first=True)
+        self.fc = nn.Linear(hidden_dim, 1)
+
+        # Graph structure, not a learned weight: kept out of the state_dict
+        self.register_buffer("a_hat", a_hat, persistent=False)
+
+    def spatial(self, x):
+        """Graph convolution of every timestep at once: [B, W, N, F] -> [B, W, N, H]."""
+        B, W, N, F = x.shape
+
+        h = self.gcn(x).reshape(B * W, N, self.hidden_dim)
+        h = torch.relu(sparse_propagate(self.a_hat, h))
+
+        return h.reshape(B, W, N, self.hidden_dim)
+
+    def spatial_per_timestep(self, x):
+        """Reference (unfused) spatial path, one GCN call per timestep."""
+        W = x.shape[1]
+
+        spatial_seq = []
+
+        for t in range(W):
+            xt = x[:, t]  # [B, N, F]
+            xt = torch.relu(sparse_propagate(self.a_hat, self.gcn(xt)))
+            spatial_seq.append(xt)
+
+        return torch.stack(spatial_seq, dim=1)  # [B, W, N, H]
+
+    def temporal(self, spatial_seq):
+        B, W, N, H = spatial_seq.shape
+
+        # reshape for LSTM
+        spatial_seq = spatial_seq.permute(0, 2, 1, 3)  # [B, N, W, H]
+        spatial_seq = spatial_seq.reshape(B * N, W, H)
+
+        lstm_out, _ = self.lstm(spatial_seq)
+
+        last_hidden = lstm_out[:, -1, :]  # [B*N, H]
+        out = self.fc(last_hidden)  # [B*N, 1]
+
+        return out.reshape(B, N)
+
+    def forward(self, x):
+        # x: [B, W, N, F]
+        return self.temporal(self.spatial(x))
+
+    def forward_per_timestep(self, x):
+        return self.temporal(self.spatial_per_timestep(x))
+
+
+def export_torchscript(model, example_input, path):
+    """Trace the fused forward path to a TorchScript file."""
+    model.eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example_input, check_trace=False)
+    traced.save(path)
+    return traced
+
+
+def save_world_model(path, model, lanes, feature_mean, feature_std, window,
+                     feature_names=None):
+    """
+    Everything needed to serve the model without the training data:
+    weights, the lane adjacency, the lane order of the node axis and the
+    feature normalization statistics.
+    """
+    model = getattr(model, "_orig_mod", model)  # unwrap torch.compile
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.save({
+        "state_dict": model.state_dict(),
+        "adjacency_indices": model.a_hat.indices().cpu(),
+        "adjacency_values": model.a_hat.values().cpu(),
+        "in_dim": model.gcn.in_features,
+        "hidden_dim": model.hidden_dim,
+        "window": int(window),
+        "lanes": list(lanes),
+        "feature_names": list(feature_names or []),
+        "feature_mean": [float(v) for v in feature_mean],
+        "feature_std": [float(v) for v in feature_std],
+    }, path)
+
+
+def load_world_model(path=MODEL_FILE, device="cpu"):
+    """(model in eval mode, checkpoint metadata) from save_world_model()."""
+    checkpoint = torch.load(path, map_location=device)
+
+    num_lanes = len(checkpoint["lanes"])
+    a_hat = torch.sparse_coo_tensor(
+        checkpoint.pop("adjacency_indices"),
+        checkpoint.pop("adjacency_values"),
+        (num_lanes, num_lanes),
+        check_invariants=True
+    ).coalesce()
+
+    model = WorldModel(
+        a_hat.to(device),
+        in_dim=checkpoint["in_dim"],
+        hidden_dim=checkpoint["hidden_dim"]
+    )
+    model.load_state_dict(checkpoint.pop("state_dict"))
+    model.to(device).eval()
+
+    return model, checkpoint
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+Loading the world-state dataset written by build_world_state_tensor.py.
+
+The dense .npy copy is memory-mapped, so loading costs no parsing and
+no copy. Builds that only produced the long-format CSV are still
+supported through a vectorized fallback.
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+STATE_FILE = "data/processed/lane_time_tensor.csv"
+DENSE_DIR = "data/processed/world_state"
+
+FEATURE_NAMES = ["mean_speed", "vehicle_count", "violation_rate"]
+
+
+def load_dense(dense_dir=DENSE_DIR, mmap_mode="r"):
+    """
+    Memory-mapped (features [T, N, F], labels [T, N], manifest). Use
+    mmap_mode="c" (copy-on-write) for arrays handed to torch.from_numpy,
+    which expects writable memory.
+    """
+    with open(os.path.join(dense_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    features = np.load(os.path.join(dense_dir, "features.npy"), mmap_mode=mmap_mode)
+    labels = np.load(os.path.join(dense_dir, "labels.npy"), mmap_mode=mmap_mode)
+
+    return features, labels, manifest
+
+
+def load_from_csv(state_file=STATE_FILE):
+    df = pd.read_csv(state_file)
+
+    lanes = sorted(df["lane_id"].unique())
+    t0 = int(df["time"].min())
+    num_timesteps = int(df["time"].max()) - t0 + 1
+
+    t = (df["time"] - t0).to_numpy()
+    i = pd.Categorical(df["lane_id"], categories=lanes).codes
+
+    features = np.zeros((num_timesteps, len(lanes), len(FEATURE_NAMES)), dtype=np.float32)
+    labels = np.zeros((num_timesteps, len(lanes)), dtype=np.float32)
+
+    features[t, i] = df[FEATURE_NAMES].to_numpy()
+    labels[t, i] = df["future_congestion"].to_numpy()
+
+    manifest = {
+        "lanes": lanes,
+        "t0": t0,
+        "num_timesteps": num_timesteps,
+        "features": FEATURE_NAMES,
+    }
+    return features, labels, manifest
+
+
+def has_dense(dense_dir=DENSE_DIR):
+    return os.path.exists(os.path.join(dense_dir, "manifest.json"))
+
+
+def load_world_state(dense_dir=DENSE_DIR, state_file=STATE_FILE, mmap_mode="r"):
+    if has_dense(dense_dir):
+        return load_dense(dense_dir, mmap_mode)
+    return load_from_csv(state_file)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""
+Many simulation runs as one training set.
+
+Every run (seed / sweep configuration) is built into its own dense
+world-state directory, a shard; a manifest lists the shards and the union
+of their lanes, which becomes the model's node axis:
+
+    data/processed/world_state_shards/manifest.json
+    data/processed/world_state_shards/run_id=<run_id>/{features,labels}.npy
+
+MultiRunWindowDataset indexes windows shard by shard, so a window never
+spans two runs. Shards are memory-mapped lazily in whichever process reads
+them, so the dataset can be handed to DataLoader workers and DDP ranks.
+
+Run as a script to build the shards of a sweep (see run_sweep.py).
+"""
+
+import os
+import json
+import argparse
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from world_state import load_dense
+from window_dataset import num_windows
+from running_stats import RunningStats, STATS_CHUNK_STEPS
+
+SHARD_ROOT = "data/processed/world_state_shards"
+SHARD_MANIFEST = os.path.join(SHARD_ROOT, "manifest.json")
+
+SWEEP_DIR = "data/sweeps/ablation"
+
+# Per-run time split, as in the single-run trainer
+SPLITS = {
+    "train": (0.0, 0.7),
+    "val": (0.7, 0.85),
+    "test": (0.85, 1.0),
+}
+
+
+def write_shard_manifest(shard_dirs, manifest_path=SHARD_MANIFEST):
+    root = os.path.dirname(manifest_path)
+    lanes = set()
+    shards = []
+
+    for shard_dir in sorted(shard_dirs):
+        with open(os.path.join(shard_dir, "manifest.json")) as f:
+            shard = json.load(f)
+
+        lanes.update(shard["lanes"])
+        shards.append({
+            "run_id": os.path.basename(shard_dir).split("=", 1)[-1],
+            "dir": os.path.relpath(shard_dir, root),
+            "num_timesteps": shard["num_timesteps"],
+            "features": shard["features"],
+        })
+
+    manifest = {
+        "lanes": sorted(lanes),
+        "features": shards[0]["features"] if shards else [],
+        "shards": shards,
+    }
+
+    os.makedirs(root or ".", exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    return manifest
+
+
+def load_shard_manifest(manifest_path=SHARD_MANIFEST):
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    root = os.path.dirname(manifest_path)
+    for shard in manifest["shards"]:
+        shard["dir"] = os.path.join(root, shard["dir"])
+
+    return manifest
+
+
+def build_sweep_shards(sweep_dir=SWEEP_DIR, shard_root=SHARD_ROOT):
+    """Build one shard per run log of a sweep and write the manifest."""
+    from build_world_state_tensor import build
+
+    logs_dir = os.path.join(sweep_dir, "logs")
+    shard_dirs = []
+
+    for run_dir in sorted(os.listdir(logs_dir)):
+        for log_name in ("vehicle_log.parquet", "vehicle_log.csv"):
+            log_path = os.path.join(logs_dir, run_dir, log_name)
+            if os.path.exists(log_path):
+                break
+        else:
+            print(f"[SKIP] {run_dir}: no vehicle log")
+            continue
+
+        shard_dir = os.path.join(shard_root, run_dir)
+        print(f"\n{run_dir}:")
+        build(log_path, dense_dir=shard_dir, output_file=None)
+        shard_dirs.append(shard_dir)
+
+    return write_shard_manifest(shard_dirs, os.path.join(shard_root, "manifest.json"))
+
+
+class MultiRunWindowDataset(Dataset):
+    """
+    (window [W, N, F], labels [N]) samples from the shards of a manifest,
+    N being the union lane set; lanes a run never used are zeros. `split`
+    picks the same time fraction of every run.
+    """
+
+    def __init__(self, manifest, window, split="train"):
+        self.window = window
+        self.lanes = manifest["lanes"]
+        self.num_features = len(manifest["features"])
+        lane_to_idx = {lane: i for i, lane in enumerate(self.lanes)}
+
+        lo, hi = SPLITS[split]
+        self.shards = []
+
+        for shard in manifest["shards"]:
+            total = num_windows(shard["num_timesteps"], window)
+            start, end = int(lo * total), int(hi * total)
+            if end <= start:
+                continue
+
+            with open(os.path.join(shard["dir"], "manifest.json")) as f:
+                shard_lanes = json.load(f)["lanes"]
+
+            self.shards.append({
+                "dir": shard["dir"],
+                "run_id": shard["run_id"],
+                "start": start,
+                "end": end,
+                "lane_idx": np.array([lane_to_idx[lane] for lane in shard_lanes], dtype=np.int64),
+            })
+
+        # offsets[k] = index of shard k's first sample
+        self.offsets = np.cumsum([0] + [s["end"] - s["start"] for s in self.shards])
+        self._arrays = {}
+
+    def __getstate__(self):
+        # Memory maps are reopened in each worker / rank, not pickled
+        state = self.__dict__.copy()
+        state["_arrays"] = {}
+        return state
+
+    def _open(self, k):
+        if k not in self._arrays:
+            features, labels, _ = load_dense(self.shards[k]["dir"])
+            self._arrays[k] = (features, labels)
+        return self._arrays[k]
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def locate(self, i):
+        """(shard number, first timestep of the window) of sample i."""
+        k = int(np.searchsorted(self.offsets, i, side="right")) - 1
+        return k, self.shards[k]["start"] + i - int(self.offsets[k])
+
+    def __getitem__(self, i):
+        k, t = self.locate(i)
+        features, labels = self._open(k)
+        lane_idx = self.shards[k]["lane_idx"]
+
+        x = np.zeros((self.window, len(self.lanes), self.num_features), dtype=np.float32)
+        y = np.zeros(len(self.lanes), dtype=np.float32)
+        x[:, lane_idx] = features[t:t + self.window]
+        y[lane_idx] = labels[t + self.window]
+
+        return torch.from_numpy(x), torch.from_numpy(y)
+
+    def feature_stats(self, chunk_steps=STATS_CHUNK_STEPS):
+        """
+        Streaming (mean, std) per feature over the timesteps this split's
+        windows read, in every shard (each shard's own lanes).
+        """
+        stats = RunningStats(self.num_features)
+
+        for k, shard in enumerate(self.shards):
+            features, _ = self._open(k)
+            end = shard["end"] + self.window - 1
+            for start in range(shard["start"], end, chunk_steps):
+                stats.update(features[start:min(start + chunk_steps, end)])
+
+        return stats.mean, stats.std
+
+    def label_counts(self):
+        """(positive, negative) label counts over every sample of the split."""
+        pos = neg = 0
+
+        for k, shard in enumerate(self.shards):
+            _, labels = self._open(k)
+            y = labels[shard["start"] + self.window:shard["end"] + self.window]
+            pos += int((y == 1).sum())
+            # Lanes missing from this run are all-zero labels
+            neg += int((y == 0).sum()) + y.shape[0] * (len(self.lanes) - y.shape[1])
+
+        return pos, neg
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sweep-dir", default=SWEEP_DIR,
+                        help="sweep directory written by run_sweep.py")
+    parser.add_argument("--shard-root", default=SHARD_ROOT)
+    args = parser.parse_args()
+
+    manifest = build_sweep_shards(args.sweep_dir, args.shard_root)
+    print(f"\n[PASS] {len(manifest['shards'])} shards, {len(manifest['lanes'])} lanes "
+          f"-> {os.path.join(args.shard_root, 'manifest.json')}")